@@ -76,6 +76,8 @@ DATABASES = {
     'default': {
         'ENGINE': os.getenv('DATABASE_ENGINE', 'django.db.backends.sqlite3'),
         'NAME': os.getenv('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'True').lower() in ('true', '1', 'yes'),
     }
 }
 
@@ -19,6 +19,7 @@ from core.home_views import (
     admin_doctors, admin_patients, admin_operations, admin_leaves,
     admin_payments, admin_medical_records
 )
+from core.metrics import metrics_view
 
 # Custom admin site login - override the admin login view
 from django.contrib.auth.views import LoginView
@@ -55,6 +56,7 @@ urlpatterns = [
     path('dashboard/', dashboard, name='dashboard'),
     path('login/', login_view, name='login'),
     path('logout/', logout_view, name='logout'),
+    path('metrics', metrics_view, name='metrics'),
     
     # =======================
     # PATIENT PORTAL ROUTES
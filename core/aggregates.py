@@ -0,0 +1,210 @@
+"""
+Denormalized doctor and patient totals.
+
+``Doctor.total_appointments``, ``total_patients`` (distinct patients booked),
+``total_earnings`` (paid invoices) and ``Patient.total_spent`` (completed
+payments) are stored on the profile rows so dashboards and lists read them
+without scanning appointment history.
+
+They are kept current the same way as the dashboard counters in
+``core.counters``: each tracked instance contributes deltas, and the model
+signals in ``core.signals`` apply the difference between its old and new
+contribution with one ``UPDATE ... SET field = field + delta`` per model,
+inside the transaction that changed the row. ``total_patients`` is not
+additive, so appointments contribute to their ``(doctor, patient)`` pair
+instead; a pair changes the count only when its first appointment is added
+or its last one removed.
+
+``QuerySet.update()`` and ``bulk_create()`` bypass signals, so callers using
+them must call ``apply_deltas`` themselves or run ``reconcile_aggregates``
+afterwards. The command also repairs the rare drift signals cannot prevent:
+two first bookings of the same pair committed concurrently, or a paid
+appointment moved to another doctor (earnings follow the invoice, which is
+not saved in that case).
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from .models import Doctor, Patient, Appointment, Invoice, Payment
+
+# Models feeding the totals and the fields their contribution depends on
+TRACKED_FIELDS = {
+    Appointment: ('doctor_id', 'patient_id'),
+    Invoice: ('appointment_id', 'status', 'amount'),
+    Payment: ('patient_id', 'status', 'amount'),
+}
+TRACKED_MODELS = tuple(TRACKED_FIELDS)
+
+# Profiles holding totals, in reconciliation order
+AGGREGATE_MODELS = (Doctor, Patient)
+
+# Key prefix of (doctor, patient) pair deltas
+PAIR = 'pair'
+
+
+def contributions(instance):
+    """
+    Return the deltas an instance contributes in its current state, keyed by
+    ``(model, pk, field)``. Paid invoices are keyed by their appointment and
+    appointments also count towards ``(PAIR, doctor_id, patient_id)``;
+    ``apply_deltas`` resolves both to doctor totals.
+    """
+    if isinstance(instance, Appointment):
+        if not instance.doctor_id:
+            return {}
+        return {
+            (Doctor, instance.doctor_id, 'total_appointments'): 1,
+            (PAIR, instance.doctor_id, instance.patient_id): 1,
+        }
+    if isinstance(instance, Invoice):
+        if instance.status == 'paid':
+            return {(Appointment, instance.appointment_id, 'total_earnings'): Decimal(instance.amount or 0)}
+        return {}
+    if isinstance(instance, Payment):
+        if instance.status == 'completed':
+            return {(Patient, instance.patient_id, 'total_spent'): Decimal(instance.amount or 0)}
+        return {}
+    return {}
+
+
+def _earnings_deltas(by_appointment):
+    """Move ``{appointment_id: amount}`` deltas onto the appointments' doctors."""
+    doctors = dict(Appointment.objects.filter(pk__in=by_appointment).values_list('pk', 'doctor_id'))
+    deltas = Counter()
+    for appointment_id, amount in by_appointment.items():
+        if appointment_id in doctors:
+            deltas[(Doctor, doctors[appointment_id], 'total_earnings')] += amount
+    return deltas
+
+
+def _patient_count_deltas(pairs):
+    """
+    Turn ``{(doctor_id, patient_id): appointments added or removed}`` into
+    ``total_patients`` deltas. Runs after the appointments were written: a
+    pair is new when all of its appointments were just added, and gone when
+    none are left.
+    """
+    rows = Appointment.objects.filter(
+        doctor_id__in={doctor_id for doctor_id, _ in pairs},
+        patient_id__in={patient_id for _, patient_id in pairs},
+    ).order_by().values('doctor_id', 'patient_id').annotate(total=Count('id'))
+    live = {(row['doctor_id'], row['patient_id']): row['total'] for row in rows}
+
+    deltas = Counter()
+    for (doctor_id, patient_id), change in pairs.items():
+        total = live.get((doctor_id, patient_id), 0)
+        if change > 0 and total == change:
+            deltas[(Doctor, doctor_id, 'total_patients')] += 1
+        elif change < 0 and total == 0:
+            deltas[(Doctor, doctor_id, 'total_patients')] -= 1
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Atomically add ``deltas`` to the stored totals with one UPDATE per model."""
+    deltas = Counter({key: value for key, value in deltas.items() if value})
+    by_appointment = {key[1]: deltas.pop(key) for key in list(deltas) if key[0] is Appointment}
+    pairs = {key[1:]: deltas.pop(key) for key in list(deltas) if key[0] == PAIR}
+    if by_appointment:
+        deltas.update(_earnings_deltas(by_appointment))
+    if pairs:
+        deltas.update(_patient_count_deltas(pairs))
+
+    per_model = defaultdict(lambda: defaultdict(dict))
+    for (model, pk, field), value in deltas.items():
+        if value:
+            per_model[model][field][pk] = value
+    for model, fields in per_model.items():
+        pks = {pk for values in fields.values() for pk in values}
+        model.objects.filter(pk__in=pks).update(**{
+            field: F(field) + Case(
+                *[When(pk=pk, then=Value(value)) for pk, value in values.items()],
+                default=Value(0),
+                output_field=model._meta.get_field(field),
+            )
+            for field, values in fields.items()
+        })
+
+
+def compute_aggregates(model, ids, appointment_model=Appointment, invoice_model=Invoice, payment_model=Payment):
+    """
+    Compute the totals of the ``model`` profiles ``ids`` from the live tables.
+    The model arguments allow running it from a migration with historical
+    models.
+    """
+    if model._meta.model_name == 'doctor':
+        values = {
+            pk: {'total_appointments': 0, 'total_patients': 0, 'total_earnings': Decimal('0.00')}
+            for pk in ids
+        }
+        appointments = appointment_model.objects.filter(doctor_id__in=ids).order_by().values('doctor_id').annotate(
+            appointments=Count('id'), patients=Count('patient_id', distinct=True)
+        )
+        for row in appointments:
+            values[row['doctor_id']]['total_appointments'] = row['appointments']
+            values[row['doctor_id']]['total_patients'] = row['patients']
+        earnings = invoice_model.objects.filter(
+            status='paid', appointment__doctor_id__in=ids
+        ).order_by().values('appointment__doctor_id').annotate(total=Sum('amount'))
+        for row in earnings:
+            values[row['appointment__doctor_id']]['total_earnings'] = row['total']
+        return values
+
+    values = {pk: {'total_spent': Decimal('0.00')} for pk in ids}
+    spent = payment_model.objects.filter(
+        status='completed', patient_id__in=ids
+    ).order_by().values('patient_id').annotate(total=Sum('amount'))
+    for row in spent:
+        values[row['patient_id']]['total_spent'] = row['total']
+    return values
+
+
+def reconcile(model, batch_size=1000, fix=True, fields=None, **live_models):
+    """
+    Compare the stored totals of every ``model`` profile with the live tables,
+    ``batch_size`` profiles at a time. Yields ``(profiles checked, drift)``
+    per batch, where drift is ``{pk: {field: (stored, live)}}``. Unless
+    ``fix`` is False, drifted rows are rewritten while the batch is locked
+    against concurrent updates. A migration passes ``fields`` and the
+    ``compute_aggregates`` models with historical models.
+    """
+    fields = fields or model.AGGREGATE_FIELDS
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = model.objects.filter(pk__gt=last_pk).order_by('pk')
+            if fix:
+                rows = rows.select_for_update()
+            stored = {row[0]: dict(zip(fields, row[1:])) for row in rows.values_list('pk', *fields)[:batch_size]}
+            if not stored:
+                return
+            live = compute_aggregates(model, list(stored), **live_models)
+            drift = {}
+            for pk, values in stored.items():
+                changed = {
+                    field: (value, live[pk][field]) for field, value in values.items() if value != live[pk][field]
+                }
+                if changed:
+                    drift[pk] = changed
+            if fix and drift:
+                model.objects.bulk_update(
+                    [model(pk=pk, **live[pk]) for pk in drift], fields, batch_size=batch_size
+                )
+        last_pk = max(stored)
+        yield len(stored), drift
+
+
+def rebuild_aggregates(batch_size=1000, doctor_model=Doctor, patient_model=Patient, **live_models):
+    """
+    Recompute every stored total. Returns the number of profiles that had
+    drifted. The model arguments allow running it from a migration with
+    historical models.
+    """
+    return sum(
+        len(drift)
+        for model, fields in ((doctor_model, Doctor.AGGREGATE_FIELDS), (patient_model, Patient.AGGREGATE_FIELDS))
+        for _checked, drift in reconcile(model, batch_size, fields=fields, **live_models)
+    )
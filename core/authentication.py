@@ -0,0 +1,19 @@
+"""
+Authentication classes for Hospital Management System.
+"""
+import time
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .metrics import observe
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that records how long token validation and user lookup take."""
+
+    def authenticate(self, request):
+        started = time.perf_counter()
+        try:
+            return super().authenticate(request)
+        finally:
+            observe('jwt_authentication_duration_seconds', time.perf_counter() - started)
@@ -0,0 +1,187 @@
+"""
+Appointment slot availability engine.
+
+Free slots are derived from three inputs:
+
+* weekly ``DoctorSchedule`` blocks, split into ``APPOINTMENT_SLOT_MINUTES``
+  slots; each block also caps the day's bookings at ``max_appointments``,
+* approved ``DoctorLeave`` ranges, which remove whole days,
+* active (scheduled/confirmed) appointments, each holding the slot stored
+  in ``Appointment.slot_start``; a slot holds at most one booking, which the
+  ``appt_doctor_slot_uniq`` constraint enforces.
+
+Leave and bookings are read from the per-day ``DoctorDayOccupancy`` rows
+kept by ``core.occupancy``, so a search runs two small queries however many
+appointments exist. Slots are labelled once per schedule shape, which most
+doctors share; a booked day only drops its taken slots and full blocks.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment, DoctorDayOccupancy, DoctorSchedule
+
+WEEKDAYS = [day for day, _ in DoctorSchedule.DAYS_OF_WEEK]
+
+ACTIVE_STATUSES = Appointment.ACTIVE_STATUSES
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _label(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def slot_start(value, slot_minutes=None):
+    """Return the local datetime of the slot that ``value`` falls in."""
+    slot_minutes = slot_minutes or settings.APPOINTMENT_SLOT_MINUTES
+    local = timezone.localtime(value) if timezone.is_aware(value) else value
+    minute = _minutes(local) // slot_minutes * slot_minutes
+    return local.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
+
+
+def assign_slots(rows, slot_minutes=None):
+    """
+    Decide which slot each appointment holds.
+
+    ``rows`` are ``(id, doctor_id, appointment_date, status)`` tuples in
+    priority order. Returns ``({id: slot_start or None}, [conflicting ids])``;
+    a conflicting appointment lost its slot to an earlier row and holds none.
+    """
+    slots = {}
+    conflicts = []
+    taken = set()
+    for pk, doctor_id, appointment_date, status in rows:
+        slot = None
+        if status in ACTIVE_STATUSES and appointment_date:
+            slot = slot_start(appointment_date, slot_minutes)
+            if (doctor_id, slot) in taken:
+                conflicts.append(pk)
+                slot = None
+            else:
+                taken.add((doctor_id, slot))
+        slots[pk] = slot
+    return slots, conflicts
+
+
+def load_schedules(doctor_ids):
+    """Return ``{(doctor_id, weekday): [(start_min, end_min, max_appointments)]}``."""
+    schedules = defaultdict(list)
+    rows = DoctorSchedule.objects.filter(
+        doctor_id__in=doctor_ids, is_available=True
+    ).values_list('doctor_id', 'day', 'start_time', 'end_time', 'max_appointments')
+    for doctor_id, day, start, end, max_appointments in rows:
+        if day in WEEKDAYS:
+            schedules[(doctor_id, WEEKDAYS.index(day))].append(
+                (_minutes(start), _minutes(end), max_appointments)
+            )
+    for blocks in schedules.values():
+        blocks.sort()
+    return schedules
+
+
+def load_occupancy(doctor_ids, start_date, end_date):
+    """Return ``{doctor_id: {date: (booked slot minutes as 'm,m,...', on leave)}}`` from the stored rows."""
+    occupancy = defaultdict(dict)
+    rows = DoctorDayOccupancy.objects.filter(
+        doctor_id__in=doctor_ids, date__gte=start_date, date__lte=end_date
+    ).values_list('doctor_id', 'date', 'booked', 'on_leave')
+    for doctor_id, day, booked, on_leave in rows:
+        occupancy[doctor_id][day] = (booked, on_leave)
+    return occupancy
+
+
+def day_template(blocks, slot_minutes, labels):
+    """
+    Return the slots of one doctor-weekday as ``[(block_start, block_end,
+    max_appointments, [(minute, label)])]``. Slots are aligned to midnight,
+    like ``slot_start``.
+    """
+    template = []
+    for block_start, block_end, max_appointments in blocks:
+        first = -(-block_start // slot_minutes) * slot_minutes
+        template.append((block_start, block_end, max_appointments, [
+            (minute, labels.get(minute) or labels.setdefault(minute, _label(minute)))
+            for minute in range(first, block_end - slot_minutes + 1, slot_minutes)
+        ]))
+    return template
+
+
+def free_slots(template, booked=(), not_before=0):
+    """Return the free slot labels of a day from its ``day_template`` and booked slot minutes."""
+    taken = set(booked)
+    free = []
+    for block_start, block_end, max_appointments, slots in template:
+        if sum(block_start <= minute < block_end for minute in booked) >= max_appointments:
+            continue
+        free += [label for minute, label in slots if minute not in taken and minute >= not_before]
+    return free
+
+
+def compute_availability(doctor_ids, start_date, end_date):
+    """
+    Compute free slots for ``doctor_ids`` between two dates (inclusive).
+
+    Returns ``{doctor_id: [{'date': 'YYYY-MM-DD', 'slots': ['09:00', ...]}]}``;
+    days without any free slot are omitted.
+    """
+    doctor_ids = list(doctor_ids)
+    slot_minutes = settings.APPOINTMENT_SLOT_MINUTES
+
+    schedules = load_schedules(doctor_ids)
+    occupancy = load_occupancy(doctor_ids, start_date, end_date)
+
+    now = timezone.localtime()
+    today = now.date()
+    days = []
+    day = max(start_date, today)
+    while day <= end_date:
+        days.append((day, day.isoformat(), day.weekday()))
+        day += timedelta(days=1)
+
+    labels = {}
+    # Schedule shape -> (day_template, free slots of an unbooked day); most
+    # doctors share a handful of shapes
+    shapes = {}
+    # (shape, booked minutes, today) -> free slots
+    booked_slots = {}
+    result = {}
+    for doctor_id in doctor_ids:
+        result[doctor_id] = available = []
+        weekdays = [None] * 7
+        for weekday in range(7):
+            blocks = schedules.get((doctor_id, weekday))
+            if blocks:
+                shape = tuple(blocks)
+                if shape not in shapes:
+                    template = day_template(blocks, slot_minutes, labels)
+                    shapes[shape] = (template, free_slots(template))
+                weekdays[weekday] = shape
+        if not any(weekdays):
+            continue
+        booked_days = occupancy.get(doctor_id, {})
+        for day, iso, weekday in days:
+            shape = weekdays[weekday]
+            if shape is None:
+                continue
+            booked, on_leave = booked_days.get(day, ('', False))
+            if on_leave:
+                continue
+            if booked or day == today:
+                key = (shape, booked, day == today)
+                slots = booked_slots.get(key)
+                if slots is None:
+                    # Slots earlier today can no longer be booked
+                    slots = booked_slots[key] = free_slots(
+                        shapes[shape][0], [int(minute) for minute in booked.split(',')] if booked else (),
+                        _minutes(now) + 1 if day == today else 0,
+                    )
+            else:
+                slots = shapes[shape][1]
+            if slots:
+                available.append({'date': iso, 'slots': slots})
+    return result
@@ -0,0 +1,134 @@
+"""
+Bulk appointment booking.
+
+A batch is validated with a fixed number of queries (doctors, patients and
+one set-based slot conflict lookup) and written with two ``bulk_create``
+calls in one transaction, however many bookings it holds. Every item gets
+its own result, so one bad row does not reject the whole batch.
+
+``bulk_create`` bypasses model signals, so the dashboard counter and
+profile total deltas of the new rows are applied, their days' stored
+occupancy refreshed, and the cached appointment, invoice and dashboard
+namespaces invalidated, explicitly.
+"""
+from django.db import IntegrityError, transaction
+
+from . import aggregates, cache, counters, occupancy
+from .availability import slot_start
+from .models import Appointment, Doctor, Invoice, Patient
+from .serializers import BulkAppointmentItemSerializer, SLOT_TAKEN_MESSAGE
+
+# Attempts made when a concurrent booking takes a slot between the conflict
+# query and the insert
+MAX_ATTEMPTS = 3
+
+
+def _taken_slots(pending):
+    """Return the ``(doctor_id, slot_start)`` pairs of ``pending`` already booked."""
+    doctor_ids = {appointment.doctor_id for appointment in pending.values()}
+    slots = {appointment.slot_start for appointment in pending.values()}
+    return set(Appointment.objects.filter(
+        doctor_id__in=doctor_ids, slot_start__in=slots
+    ).values_list('doctor_id', 'slot_start'))
+
+
+def _insert(pending, fees):
+    """Insert appointments and their invoices; returns ``{index: (appointment, invoice)}``."""
+    with transaction.atomic():
+        appointments = Appointment.objects.bulk_create(list(pending.values()))
+        invoices = Invoice.objects.bulk_create([
+            Invoice(
+                appointment=appointment,
+                amount=fees[appointment.doctor_id],
+                description=f"Consultation fee for appointment on {appointment.appointment_date}"
+            )
+            for appointment in appointments
+        ])
+        counters.apply_deltas(counters.merge(*[
+            counters.contributions(obj) for obj in appointments + invoices
+        ]))
+        aggregates.apply_deltas(counters.merge(*[
+            aggregates.contributions(appointment) for appointment in appointments
+        ]))
+        occupancy.schedule_refresh(Appointment, [occupancy.state(appointment) for appointment in appointments])
+        cache.invalidate('appointment', 'invoice', *{
+            cache.profile_namespace(role, profile_id)
+            for appointment in appointments
+            for role, profile_id in (('doctor', appointment.doctor_id), ('patient', appointment.patient_id))
+        })
+    return dict(zip(pending, zip(appointments, invoices)))
+
+
+def book_appointments(items):
+    """
+    Validate and create a batch of bookings.
+
+    ``items`` is a list of dicts accepted by ``BulkAppointmentItemSerializer``.
+    Returns one result per item, in order: ``{'index', 'status': 'created',
+    'id', 'invoice'}`` or ``{'index', 'status': 'error', 'errors'}``.
+    """
+    results = [None] * len(items)
+    valid = {}
+    for index, item in enumerate(items):
+        serializer = BulkAppointmentItemSerializer(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+    fees = dict(Doctor.objects.filter(
+        id__in={data['doctor'] for data in valid.values()}
+    ).values_list('id', 'consultation_fee'))
+    patient_ids = set(Patient.objects.filter(
+        id__in={data['patient'] for data in valid.values()}
+    ).values_list('id', flat=True))
+
+    pending = {}
+    seen = set()
+    for index, data in valid.items():
+        errors = {}
+        if data['doctor'] not in fees:
+            errors['doctor'] = ['Doctor not found.']
+        if data['patient'] not in patient_ids:
+            errors['patient'] = ['Patient not found.']
+        slot = slot_start(data['appointment_date'])
+        if (data['doctor'], slot) in seen:
+            errors['appointment_date'] = ['Another booking in this batch holds this slot.']
+        if errors:
+            results[index] = {'index': index, 'status': 'error', 'errors': errors}
+            continue
+        seen.add((data['doctor'], slot))
+        pending[index] = Appointment(
+            doctor_id=data['doctor'],
+            patient_id=data['patient'],
+            appointment_date=data['appointment_date'],
+            slot_start=slot,
+            reason=data['reason'],
+            notes=data['notes'],
+        )
+
+    for attempt in range(MAX_ATTEMPTS):
+        taken = _taken_slots(pending) if pending else set()
+        for index in [i for i, a in pending.items() if (a.doctor_id, a.slot_start) in taken]:
+            del pending[index]
+            results[index] = {
+                'index': index, 'status': 'error',
+                'errors': {'appointment_date': [SLOT_TAKEN_MESSAGE]}
+            }
+        if not pending:
+            break
+        try:
+            created = _insert(pending, fees)
+        except IntegrityError:
+            # Lost a race for a slot; look the conflicts up again
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            continue
+        for index, (appointment, invoice) in created.items():
+            results[index] = {
+                'index': index, 'status': 'created',
+                'id': appointment.pk, 'invoice': invoice.pk
+            }
+        break
+
+    return results
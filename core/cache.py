@@ -0,0 +1,117 @@
+"""
+Versioned cache namespaces.
+
+Cached values are grouped by the role they were rendered for and the entity
+they depend on (``cached('doctor', 'appointment', ...)``). Every entity has
+a version number stored in the cache itself, so with the Redis backend all
+gunicorn workers share it. Keys embed the entity version and a global
+version:
+
+    <role>:<entity>:v<entity version>.<global version>:<parts>
+
+Changing an entity (``invalidate('appointment')``, called by the model
+signals after commit) bumps its version, which makes every key built on the
+old one unreachable; the stale entries then expire on their own. ``clear()``
+bumps the global version and so drops every namespace at once.
+
+Data that belongs to one doctor or patient, such as their dashboard, lives
+in a per-profile namespace (``profile_namespace('doctor', 7)``), so a change
+only invalidates the dashboards of the profiles it touches.
+"""
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+from .metrics import record_cache
+
+# Model name -> entity namespace it invalidates
+ENTITIES = {
+    'User': 'user',
+    'Doctor': 'doctor',
+    'Patient': 'patient',
+    'Appointment': 'appointment',
+    'Prescription': 'prescription',
+    'Invoice': 'invoice',
+    'Payment': 'payment',
+    'MedicalRecord': 'medical_record',
+    'Operation': 'operation',
+    'DoctorLeave': 'leave',
+    'DoctorSchedule': 'schedule',
+}
+
+GLOBAL_VERSION_KEY = 'ns-version'
+
+_MISSING = object()
+
+
+def _version_key(entity):
+    return f'ns-version:{entity}'
+
+
+def _fresh_version():
+    # Seeded from the clock so a version key evicted from the cache never
+    # comes back with a number that old entries were stored under
+    return time.time_ns() // 1000
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def profile_namespace(role, profile_id):
+    """Return the entity namespace of the data belonging to one doctor or patient."""
+    return f'{role}.{profile_id}'
+
+
+def version(entity):
+    """Return the current version of ``entity``, e.g. to vary a ``{% cache %}`` fragment on."""
+    entity_key = _version_key(entity)
+    versions = _versions([entity_key, GLOBAL_VERSION_KEY])
+    return f'{versions[entity_key]}.{versions[GLOBAL_VERSION_KEY]}'
+
+
+def make_key(role, entity, *parts):
+    """Return the cache key of ``parts`` in the ``role``/``entity`` namespace."""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{role}:{entity}:v{version(entity)}:{suffix}'
+
+
+def cached(role, entity, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the value cached under ``parts`` for ``role``/``entity``, calling
+    ``compute()`` and storing its result on a miss.
+    """
+    key = make_key(role, entity, *parts)
+    value = cache.get(key, _MISSING)
+    record_cache(f'{role}:{entity}', value is not _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def invalidate(*entities):
+    """Drop every cached value of ``entities`` for all roles once the current transaction commits."""
+    def bump():
+        for entity in entities:
+            _bump(_version_key(entity))
+    transaction.on_commit(bump)
+
+
+def clear():
+    """Drop every cached value in every namespace, on all workers."""
+    _bump(GLOBAL_VERSION_KEY)
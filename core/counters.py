@@ -0,0 +1,198 @@
+"""
+Incrementally maintained dashboard counters.
+
+Every dashboard statistic is stored as a row in DashboardCounter and is
+adjusted by the model signals in core.signals, so reading the dashboard
+costs one small query no matter how large the tables grow.
+
+Each tracked instance contributes a set of deltas to the counters (e.g. a
+paid invoice contributes its amount to ``total_revenue``). On save the
+difference between the old and new contribution is applied; on delete the
+old contribution is removed. ``QuerySet.update()`` and ``bulk_create()``
+bypass signals, so callers using them must call ``apply_deltas`` themselves
+or run the ``rebuild_dashboard_counters`` command afterwards.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import Case, When, Value, F, Count, DecimalField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Doctor, Patient, Appointment, Invoice, DoctorLeave, Operation, Payment, DashboardCounter
+)
+from .stats import compute_dashboard_stats
+
+# Counters holding integer counts; everything else is a money amount
+COUNT_KEYS = (
+    'total_doctors', 'total_patients', 'total_appointments',
+    'completed_appointments', 'cancelled_appointments', 'pending_invoices',
+    'total_operations', 'pending_leaves', 'pending_payments',
+)
+AMOUNT_KEYS = ('total_revenue',)
+
+# Per-day appointment counters back the "today" statistic
+DAY_KEY_PREFIX = 'appointments:'
+
+# Written by rebuild_counters() so readers know the counters have a baseline
+INITIALIZED_KEY = 'initialized'
+
+# Models feeding the counters and the fields their contribution depends on
+TRACKED_FIELDS = {
+    Doctor: (),
+    Patient: (),
+    Operation: (),
+    Appointment: ('appointment_date', 'status'),
+    Invoice: ('status', 'amount'),
+    DoctorLeave: ('status',),
+    Payment: ('status',),
+}
+TRACKED_MODELS = tuple(TRACKED_FIELDS)
+
+
+def appointment_day_key(value):
+    """Return the per-day counter key for an appointment datetime or date."""
+    if hasattr(value, 'hour'):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return f"{DAY_KEY_PREFIX}{value.isoformat()}"
+
+
+def contributions(instance):
+    """Return the counter deltas an instance contributes in its current state."""
+    if isinstance(instance, Doctor):
+        return {'total_doctors': 1}
+    if isinstance(instance, Patient):
+        return {'total_patients': 1}
+    if isinstance(instance, Operation):
+        return {'total_operations': 1}
+    if isinstance(instance, Appointment):
+        deltas = {'total_appointments': 1}
+        if instance.appointment_date:
+            deltas[appointment_day_key(instance.appointment_date)] = 1
+        if instance.status == 'completed':
+            deltas['completed_appointments'] = 1
+        elif instance.status == 'cancelled':
+            deltas['cancelled_appointments'] = 1
+        return deltas
+    if isinstance(instance, Invoice):
+        if instance.status == 'pending':
+            return {'pending_invoices': 1}
+        if instance.status == 'paid':
+            return {'total_revenue': Decimal(instance.amount or 0)}
+        return {}
+    if isinstance(instance, DoctorLeave):
+        return {'pending_leaves': 1} if instance.status == 'pending' else {}
+    if isinstance(instance, Payment):
+        return {'pending_payments': 1} if instance.status == 'pending' else {}
+    return {}
+
+
+def diff(old, new):
+    """Return the deltas that turn contribution ``old`` into ``new``."""
+    deltas = Counter()
+    for key, value in new.items():
+        deltas[key] += value
+    for key, value in old.items():
+        deltas[key] -= value
+    return {key: value for key, value in deltas.items() if value}
+
+
+def negate(deltas):
+    return {key: -value for key, value in deltas.items()}
+
+
+def merge(*deltas_list):
+    """Sum several delta dicts, e.g. for bulk inserts."""
+    total = Counter()
+    for deltas in deltas_list:
+        for key, value in deltas.items():
+            total[key] += value
+    return {key: value for key, value in total.items() if value}
+
+
+def apply_deltas(deltas):
+    """Atomically add ``deltas`` to the stored counters with a single UPDATE."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    increment = Case(
+        *[When(key=key, then=Value(Decimal(value))) for key, value in deltas.items()],
+        default=Value(Decimal(0)),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    updated = DashboardCounter.objects.filter(key__in=deltas).update(value=F('value') + increment)
+
+    if updated < len(deltas):
+        # First touch of a key (e.g. a new appointment day): create and retry the rest
+        existing = set(DashboardCounter.objects.filter(key__in=deltas).values_list('key', flat=True))
+        missing = {key: value for key, value in deltas.items() if key not in existing}
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key, value=0) for key in missing],
+            ignore_conflicts=True
+        )
+        apply_deltas(missing)
+
+
+def compute_counters():
+    """Compute every counter value from the live tables."""
+    stats = compute_dashboard_stats()
+    values = {key: Decimal(stats[key]) for key in COUNT_KEYS + AMOUNT_KEYS}
+    values[INITIALIZED_KEY] = Decimal(1)
+
+    per_day = Appointment.objects.annotate(
+        day=TruncDate('appointment_date')
+    ).values('day').annotate(total=Count('id')).order_by()
+    for row in per_day:
+        values[appointment_day_key(row['day'])] = Decimal(row['total'])
+    return values
+
+
+def read_counters():
+    """Return all stored counters as a dict."""
+    return dict(DashboardCounter.objects.values_list('key', 'value'))
+
+
+def find_drift(stored=None, live=None):
+    """Return ``{key: (stored, live)}`` for every counter that disagrees."""
+    stored = read_counters() if stored is None else stored
+    live = compute_counters() if live is None else live
+    drift = {}
+    for key in set(stored) | set(live):
+        stored_value = stored.get(key, Decimal(0))
+        live_value = live.get(key, Decimal(0))
+        if stored_value != live_value:
+            drift[key] = (stored_value, live_value)
+    return drift
+
+
+def rebuild_counters():
+    """Recompute all counters from the live tables. Returns the drift that was fixed."""
+    live = compute_counters()
+    drift = find_drift(live=live)
+
+    DashboardCounter.objects.exclude(key__in=live).delete()
+    for key, value in live.items():
+        DashboardCounter.objects.update_or_create(key=key, defaults={'value': value})
+    return drift
+
+
+def get_dashboard_stats():
+    """
+    Return dashboard statistics read from the counter table.
+
+    The counters are built from the live tables the first time they are read.
+    """
+    today_key = appointment_day_key(timezone.now())
+    keys = COUNT_KEYS + AMOUNT_KEYS + (today_key, INITIALIZED_KEY)
+    stored = dict(DashboardCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+
+    if INITIALIZED_KEY not in stored:
+        rebuild_counters()
+        stored = dict(DashboardCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+
+    stats = {key: int(stored.get(key, 0)) for key in COUNT_KEYS}
+    stats['total_revenue'] = stored.get('total_revenue', Decimal(0))
+    stats['today_appointments'] = int(stored.get(today_key, 0))
+    return stats
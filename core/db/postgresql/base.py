@@ -0,0 +1,85 @@
+"""
+PostgreSQL backend with an in-process connection pool (psycopg 3 only).
+
+Selected by ``DATABASE_POOL=True`` in settings; install its dependencies
+with ``pip install -r requirements-pool.txt``. Each worker process keeps a
+``psycopg_pool.ConnectionPool`` per database alias, holding
+``DATABASE_POOL_MIN_SIZE`` to ``DATABASE_POOL_MAX_SIZE`` connections shared
+by its threads. Django "opens" a connection by borrowing one from the pool
+and "closes" it by handing it back, which happens at the end of every
+request as ``CONN_MAX_AGE`` is 0 in this mode. Connections are checked
+before they are handed out, so a dropped connection is replaced rather than
+failing a request.
+
+The time spent waiting for a free connection is recorded in the
+``db_pool_wait_seconds`` metric; ``db_pool_timeouts_total`` counts requests
+that gave up after ``DATABASE_POOL_TIMEOUT`` seconds.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+from core import metrics
+
+try:
+    from psycopg_pool import ConnectionPool, PoolTimeout
+except ImportError:
+    ConnectionPool = PoolTimeout = None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # alias -> pool, shared by every thread of the process
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def get_pool(self, conn_params):
+        pool = self._pools.get(self.alias)
+        if pool is not None:
+            return pool
+        if not is_psycopg3 or ConnectionPool is None:
+            raise ImproperlyConfigured(
+                'DATABASE_POOL requires psycopg 3 and psycopg_pool: pip install -r requirements-pool.txt'
+            )
+        with self._pools_lock:
+            if self.alias not in self._pools:
+                self._pools[self.alias] = ConnectionPool(
+                    kwargs=conn_params,
+                    min_size=settings.DATABASE_POOL_MIN_SIZE,
+                    max_size=settings.DATABASE_POOL_MAX_SIZE,
+                    timeout=settings.DATABASE_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+                    name=f'hms-{self.alias}',
+                    open=True,
+                )
+            return self._pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+        except ValueError:
+            raise ImproperlyConfigured(f"Invalid transaction isolation level {options['isolation_level']}.")
+
+        started = time.perf_counter()
+        try:
+            connection = pool.getconn()
+        except PoolTimeout:
+            metrics.inc('db_pool_timeouts_total', alias=self.alias)
+            raise
+        finally:
+            metrics.observe('db_pool_wait_seconds', time.perf_counter() - started, alias=self.alias)
+
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # The pool rolls back anything left open and discards broken connections
+                self._pools[self.alias].putconn(self.connection)
@@ -0,0 +1,83 @@
+"""
+Read-replica database routing.
+
+Replica aliases (``replica1``, ``replica2``, ...) are built from
+``DATABASE_REPLICA_URLS``. ``ReplicaRouter`` sends reads to a random replica
+only while a request marked read-only by
+``core.middleware.ReplicaRoutingMiddleware`` is running; everything else,
+including every write, management commands and background work, uses the
+primary (``default``).
+
+Read-your-writes: once a request writes anything, its remaining reads go to
+the primary, and the middleware pins the client to the primary for
+``REPLICA_PIN_SECONDS`` with a cookie, covering the redirect or poll that
+follows a POST. Reads inside a transaction on the primary also stay there.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class RoutingState:
+    """Replica routing of the current request."""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def routing(state):
+    """Route the database reads run inside the block according to ``state``."""
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def stream_with(state, content):
+    """Keep ``state`` active while a streaming response's content is consumed."""
+    # Runs after the middleware has returned, so there is no outer state to
+    # restore; set() rather than a token reset() as the generator may be
+    # closed from another context
+    _state.set(state)
+    try:
+        yield from content
+    finally:
+        _state.set(None)
+
+
+class ReplicaRouter:
+    """Send the reads of read-only requests to the replicas and everything else to the primary."""
+
+    def __init__(self):
+        self.replicas = list(settings.DATABASE_REPLICAS)
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            not self.replicas or state is None or not state.use_replicas or state.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,203 @@
+"""
+Streaming CSV and NDJSON exports.
+
+    GET /api/exports/<resource>/<csv|ndjson>/?start=&end=&status=&doctor=
+
+Rows are read with ``values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+(a server-side cursor on PostgreSQL), so no model instances are built and at
+most one chunk of rows is held in memory at a time, however large the export.
+Output is written one chunk at a time through a ``StreamingHttpResponse``.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError
+
+from .authentication import TimedJWTAuthentication
+from .models import Invoice, Payment, MedicalRecord
+from .permissions import IsAdminUser
+from .renderers import dumps
+
+
+def _full_name(path):
+    return Concat(f'{path}__first_name', Value(' '), f'{path}__last_name')
+
+
+# resource -> model, exported columns (name -> field path or expression) and
+# the field paths the ?doctor= and ?status= filters apply to
+EXPORTS = {
+    'invoices': {
+        'model': Invoice,
+        'columns': {
+            'id': 'id',
+            'appointment_id': 'appointment_id',
+            'appointment_date': 'appointment__appointment_date',
+            'doctor_id': 'appointment__doctor_id',
+            'doctor_name': _full_name('appointment__doctor__user'),
+            'patient_id': 'appointment__patient_id',
+            'patient_name': _full_name('appointment__patient__user'),
+            'amount': 'amount',
+            'status': 'status',
+            'due_date': 'due_date',
+            'paid_at': 'paid_at',
+            'created_at': 'created_at',
+        },
+        'doctor': 'appointment__doctor_id',
+        'status': 'status',
+    },
+    'payments': {
+        'model': Payment,
+        'columns': {
+            'id': 'id',
+            'invoice_id': 'invoice_id',
+            'doctor_id': 'invoice__appointment__doctor_id',
+            'patient_id': 'patient_id',
+            'patient_name': _full_name('patient__user'),
+            'amount': 'amount',
+            'payment_method': 'payment_method',
+            'status': 'status',
+            'transaction_id': 'transaction_id',
+            'paid_at': 'paid_at',
+            'created_at': 'created_at',
+        },
+        'doctor': 'invoice__appointment__doctor_id',
+        'status': 'status',
+    },
+    'medical-records': {
+        'model': MedicalRecord,
+        'columns': {
+            'id': 'id',
+            'appointment_id': 'appointment_id',
+            'doctor_id': 'doctor_id',
+            'doctor_name': _full_name('doctor__user'),
+            'patient_id': 'patient_id',
+            'patient_name': _full_name('patient__user'),
+            'diagnosis': 'diagnosis',
+            'treatment': 'treatment',
+            'follow_up_date': 'follow_up_date',
+            'created_at': 'created_at',
+        },
+        'doctor': 'doctor_id',
+        'status': None,
+    },
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(resource, params):
+    """
+    Return ``(column names, row iterator)`` for ``resource`` filtered by
+    ``params``: ``start`` and ``end`` (ISO dates, inclusive, on
+    ``created_at``), ``status`` and ``doctor``.
+    """
+    spec = EXPORTS[resource]
+    model = spec['model']
+    queryset = model.objects.all()
+    errors = {}
+
+    dates = {}
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            dates[name] = parse_date(value)
+        except ValueError:
+            # Well formed but impossible, e.g. 2026-02-30
+            dates[name] = None
+        if dates[name] is None:
+            errors[name] = ['Use an ISO date (YYYY-MM-DD).']
+    if dates.get('start'):
+        queryset = queryset.filter(created_at__gte=_day_start(dates['start']))
+    if dates.get('end'):
+        queryset = queryset.filter(created_at__lt=_day_start(dates['end'] + timedelta(days=1)))
+
+    status = params.get('status')
+    if status:
+        choices = dict(model._meta.get_field('status').choices) if spec['status'] else {}
+        if status not in choices:
+            errors['status'] = [
+                f'Choose one of: {", ".join(choices)}.' if choices else f'{resource} have no status.'
+            ]
+        else:
+            queryset = queryset.filter(**{spec['status']: status})
+
+    doctor = params.get('doctor')
+    if doctor:
+        if not doctor.isdigit():
+            errors['doctor'] = ['Use a doctor id.']
+        else:
+            queryset = queryset.filter(**{spec['doctor']: int(doctor)})
+
+    if errors:
+        raise ValidationError(errors)
+
+    columns = spec['columns']
+    expressions = {name: value for name, value in columns.items() if not isinstance(value, str)}
+    fields = [name if name in expressions else value for name, value in columns.items()]
+    rows = queryset.annotate(**expressions).order_by('id').values_list(*fields).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    return list(columns), rows
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows, settings.EXPORT_CHUNK_SIZE):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(columns, rows):
+    for chunk in _chunks(rows, settings.EXPORT_CHUNK_SIZE):
+        yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in chunk)
+
+
+@api_view(['GET'])
+@authentication_classes([TimedJWTAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def export(request, resource, fmt):
+    """Stream every ``resource`` row matching the filters as CSV or NDJSON (admins only)."""
+    if resource not in EXPORTS or fmt not in CONTENT_TYPES:
+        raise Http404
+    columns, rows = export_rows(resource, request.query_params)
+    stream = stream_csv if fmt == 'csv' else stream_ndjson
+    response = StreamingHttpResponse(stream(columns, rows), content_type=CONTENT_TYPES[fmt])
+    filename = f'{resource}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,23 @@
+"""
+Filter backends for Hospital Management System.
+"""
+from rest_framework.filters import SearchFilter
+
+from . import search
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    ``?search=`` through the indexed doctor and patient search in
+    ``core.search``: every word must match the start of a word of the
+    profile, and the best matches come first. Other models are searched on
+    the view's ``search_fields`` like ``SearchFilter``.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        if queryset.model not in search.INDEXED_MODELS:
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '').replace('\x00', '')
+        if not query.strip():
+            return queryset
+        return search.search_profiles(queryset, query)
@@ -2,17 +2,47 @@
 Home page views for Hospital Management System.
 """
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.conf import settings
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, Max, Q, Prefetch
 from django.utils import timezone
 from datetime import timedelta, datetime
 
 from .models import User, Doctor, Patient, Appointment, Prescription, Invoice, DoctorLeave, Operation, Payment, MedicalRecord, DoctorSchedule
+from . import cache, search
+from .counters import get_dashboard_stats
+
+
+def render_paginated(request, template_name, context_name, queryset, context=None):
+    """
+    Render one page (``?page=``) of ``queryset`` as ``context_name``.
+    
+    The total comes from a separate COUNT query, so only the rows on the page
+    are loaded. With ``?fragment=1`` only the rows partial
+    (``partials/<template>_rows.html``) is rendered, for infinite scrolling;
+    the next page number is sent in the ``X-Next-Page`` header.
+    """
+    page_obj = Paginator(queryset, settings.PORTAL_PAGE_SIZE).get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('fragment', None)
+    context = dict(context or {}, page_obj=page_obj)
+    context['page_query'] = query.urlencode() + '&' if query else ''
+    context[context_name] = page_obj
+    
+    if request.GET.get('fragment'):
+        rows_template = 'partials/' + template_name.replace('.html', '_rows.html')
+        response = render(request, rows_template, context)
+        if page_obj.has_next():
+            response['X-Next-Page'] = page_obj.next_page_number()
+        return response
+    
+    return render(request, template_name, context)
 
 
 def home(request):
@@ -38,7 +68,7 @@ def doctors_list(request):
 def patients_list(request):
     """Display list of patients."""
     patients = Patient.objects.select_related('user').all()
-    return render(request, 'patients.html', {'patients': patients})
+    return render_paginated(request, 'patients.html', 'patients', patients)
 
 
 def appointments_list(request):
@@ -46,7 +76,7 @@ def appointments_list(request):
     appointments = Appointment.objects.select_related(
         'doctor__user', 'patient__user'
     ).all()
-    return render(request, 'appointments.html', {'appointments': appointments})
+    return render_paginated(request, 'appointments.html', 'appointments', appointments)
 
 
 def prescriptions_list(request):
@@ -54,7 +84,7 @@ def prescriptions_list(request):
     prescriptions = Prescription.objects.select_related(
         'appointment__doctor__user', 'appointment__patient__user', 'created_by__user'
     ).all()
-    return render(request, 'prescriptions.html', {'prescriptions': prescriptions})
+    return render_paginated(request, 'prescriptions.html', 'prescriptions', prescriptions)
 
 
 def invoices_list(request):
@@ -62,41 +92,17 @@ def invoices_list(request):
     invoices = Invoice.objects.select_related(
         'appointment__doctor__user', 'appointment__patient__user'
     ).all()
-    return render(request, 'invoices.html', {'invoices': invoices})
+    return render_paginated(request, 'invoices.html', 'invoices', invoices)
 
 
 def dashboard(request):
     """Display admin dashboard with statistics."""
-    today = timezone.now().date()
-    today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
-    today_end = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.max.time()))
-    
     # Check if user is admin
     if not request.user.is_authenticated or request.user.role != 'admin':
         messages.error(request, 'Admin access required!')
         return redirect('login')
     
-    # Basic stats
-    stats = {
-        'total_doctors': Doctor.objects.count(),
-        'total_patients': Patient.objects.count(),
-        'total_appointments': Appointment.objects.count(),
-        'today_appointments': Appointment.objects.filter(
-            appointment_date__gte=today_start,
-            appointment_date__lte=today_end
-        ).count(),
-        'pending_invoices': Invoice.objects.filter(status='pending').count(),
-        'total_revenue': Invoice.objects.filter(status='paid').aggregate(
-            total=Sum('amount')
-        )['total'] or 0,
-        'completed_appointments': Appointment.objects.filter(status='completed').count(),
-        'cancelled_appointments': Appointment.objects.filter(status='cancelled').count(),
-    }
-    
-    # Extended stats
-    stats['total_operations'] = Operation.objects.count()
-    stats['pending_leaves'] = DoctorLeave.objects.filter(status='pending').count()
-    stats['pending_payments'] = Payment.objects.filter(status='pending').count()
+    stats = get_dashboard_stats()
     
     return render(request, 'dashboard.html', {'stats': stats})
 
@@ -162,7 +168,7 @@ def doctor_dashboard(request):
         return redirect('home')
     
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = Doctor.objects.select_related('user').get(user=request.user)
     except Doctor.DoesNotExist:
         messages.error(request, 'Doctor profile not found!')
         return redirect('home')
@@ -183,27 +189,23 @@ def doctor_dashboard(request):
         doctor=doctor
     ).select_related('patient__user').order_by('-appointment_date')[:10]
     
-    # Get completed appointments count
-    completed_count = Appointment.objects.filter(doctor=doctor, status='completed').count()
-    pending_count = Appointment.objects.filter(doctor=doctor, status='scheduled').count()
-    
     # Get recent patients
     recent_patients = Appointment.objects.filter(
         doctor=doctor
     ).select_related('patient__user').order_by('-appointment_date')[:5]
     
-    # Get unique patients count
-    unique_patients = Appointment.objects.filter(doctor=doctor).values('patient').distinct().count()
-    
-    # Stats
-    stats = {
-        'total_appointments': Appointment.objects.filter(doctor=doctor).count(),
+    # Stats and the appointment lists are cached until one of this doctor's
+    # appointments, prescriptions, invoices or medical records changes
+    namespace = cache.profile_namespace('doctor', doctor.id)
+    stats = cache.cached('doctor', namespace, ('stats', today), lambda: {
         'today_appointments': today_appointments.count(),
-        'completed_appointments': completed_count,
-        'pending_appointments': pending_count,
-        'total_patients_treated': unique_patients,
-        'total_earnings': doctor.total_earnings,
-    }
+        'completed_appointments': Appointment.objects.filter(doctor=doctor, status='completed').count(),
+        'pending_appointments': Appointment.objects.filter(doctor=doctor, status='scheduled').count(),
+    })
+    # Totals are kept on the doctor row by core.aggregates
+    stats['total_appointments'] = doctor.total_appointments
+    stats['total_patients_treated'] = doctor.total_patients
+    stats['total_earnings'] = doctor.total_earnings
     
     context = {
         'doctor': doctor,
@@ -211,6 +213,9 @@ def doctor_dashboard(request):
         'all_appointments': all_appointments,
         'stats': stats,
         'recent_patients': recent_patients,
+        'today': today,
+        'fragment_version': cache.version(namespace),
+        'fragment_timeout': settings.CACHE_TIMEOUT,
     }
     
     return render(request, 'doctor_dashboard.html', context)
@@ -231,7 +236,7 @@ def doctor_appointments(request):
         doctor=doctor
     ).select_related('patient__user').order_by('-appointment_date')
     
-    return render(request, 'doctor_appointments.html', {'appointments': appointments})
+    return render_paginated(request, 'doctor_appointments.html', 'appointments', appointments)
 
 
 def doctor_patients(request):
@@ -315,7 +320,7 @@ def patient_dashboard(request):
         return redirect('home')
     
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = Patient.objects.select_related('user').get(user=request.user)
     except Patient.DoesNotExist:
         messages.error(request, 'Patient profile not found!')
         return redirect('home')
@@ -345,14 +350,16 @@ def patient_dashboard(request):
         patient=patient
     ).select_related('doctor__user').order_by('-created_at')[:5]
     
-    # Calculate stats
-    stats = {
+    # Stats and the lists are cached until one of this patient's appointments,
+    # prescriptions, invoices, payments or medical records changes
+    namespace = cache.profile_namespace('patient', patient.id)
+    stats = cache.cached('patient', namespace, ('stats',), lambda: {
         'total_appointments': Appointment.objects.filter(patient=patient).count(),
         'completed_appointments': Appointment.objects.filter(patient=patient, status='completed').count(),
         'pending_invoices': Invoice.objects.filter(appointment__patient=patient, status='pending').count(),
-        'total_spent': patient.total_spent,
         'total_prescriptions': Prescription.objects.filter(appointment__patient=patient).count(),
-    }
+    })
+    stats['total_spent'] = patient.total_spent
     
     context = {
         'patient': patient,
@@ -362,6 +369,8 @@ def patient_dashboard(request):
         'payments': payments,
         'medical_records': medical_records,
         'stats': stats,
+        'fragment_version': cache.version(namespace),
+        'fragment_timeout': settings.CACHE_TIMEOUT,
     }
     
     return render(request, 'patient_dashboard.html', context)
@@ -382,7 +391,7 @@ def patient_appointments(request):
         patient=patient
     ).select_related('doctor__user').order_by('-appointment_date')
     
-    return render(request, 'patient_appointments.html', {'appointments': appointments})
+    return render_paginated(request, 'patient_appointments.html', 'appointments', appointments)
 
 
 def patient_prescriptions(request):
@@ -479,18 +488,12 @@ def admin_doctors(request):
         messages.error(request, 'Admin access required!')
         return redirect('login')
     
-    search_query = request.GET.get('search', '')
+    search_query = request.GET.get('search', '').strip()
+    doctors = Doctor.objects.select_related('user').order_by('-created_at')
     if search_query:
-        doctors = Doctor.objects.select_related('user').filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(specialty__icontains=search_query) |
-            Q(qualification__icontains=search_query)
-        ).order_by('-created_at')
-    else:
-        doctors = Doctor.objects.select_related('user').order_by('-created_at')
+        doctors = search.search_profiles(doctors, search_query)
     
-    return render(request, 'admin_doctors.html', {'doctors': doctors, 'search_query': search_query})
+    return render_paginated(request, 'admin_doctors.html', 'doctors', doctors, {'search_query': search_query})
 
 
 def admin_patients(request):
@@ -499,72 +502,79 @@ def admin_patients(request):
         messages.error(request, 'Admin access required!')
         return redirect('login')
     
-    search_query = request.GET.get('search', '')
+    search_query = request.GET.get('search', '').strip()
+    patients = Patient.objects.select_related('user').order_by('-created_at')
     if search_query:
-        patients = Patient.objects.select_related('user').filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(blood_type__icontains=search_query)
-        ).order_by('-created_at')
-    else:
-        patients = Patient.objects.select_related('user').order_by('-created_at')
+        patients = search.search_profiles(patients, search_query)
     
-    return render(request, 'admin_patients.html', {'patients': patients, 'search_query': search_query})
+    return render_paginated(request, 'admin_patients.html', 'patients', patients, {'search_query': search_query})
+
+
+# Detail rows shown inline under each doctor on the grouped admin pages
+INLINE_DETAIL_ROWS = 5
+
+
+def selected_doctor(request, doctors):
+    """Return the doctor picked with ``?doctor=<id>`` from ``doctors``, None without one; 404 if unknown."""
+    doctor_id = request.GET.get('doctor')
+    if not doctor_id:
+        return None
+    if not doctor_id.isdigit():
+        raise Http404('No such doctor.')
+    return get_object_or_404(doctors, pk=int(doctor_id))
 
 
 def admin_operations(request):
-    """Admin view all operations."""
+    """Admin view all operations, summarised per doctor."""
     if not request.user.is_authenticated or request.user.role != 'admin':
         messages.error(request, 'Admin access required!')
         return redirect('login')
     
-    # Get all operations grouped by doctor
-    operations = Operation.objects.select_related('doctor__user', 'patient__user').order_by('-operation_date')
-    
-    # Group operations by doctor
-    doctor_operations = {}
-    for op in operations:
-        doctor = op.doctor
-        if doctor not in doctor_operations:
-            doctor_operations[doctor] = {
-                'surgeries': [],
-                'count': 0,
-                'completed_count': 0
-            }
-        doctor_operations[doctor]['surgeries'].append(op)
-        doctor_operations[doctor]['count'] += 1
-        if op.status == 'completed':
-            doctor_operations[doctor]['completed_count'] += 1
+    # Per-doctor counts are aggregated by the database
+    doctors = Doctor.objects.select_related('user').annotate(
+        operation_count=Count('operations'),
+        completed_count=Count('operations', filter=Q(operations__status='completed')),
+        latest_operation=Max('operations__operation_date'),
+    ).filter(operation_count__gt=0)
     
-    return render(request, 'admin_operations.html', {'doctor_operations': doctor_operations})
+    # ?doctor=<id> expands one doctor's full, paginated surgery history
+    doctor = selected_doctor(request, doctors)
+    if doctor is not None:
+        operations = Operation.objects.filter(doctor=doctor).select_related('patient__user').order_by('-operation_date')
+        return render_paginated(request, 'admin_operations.html', 'operations', operations, {'selected_doctor': doctor})
+    
+    doctors = doctors.order_by('-latest_operation', 'id').prefetch_related(Prefetch(
+        'operations',
+        queryset=Operation.objects.select_related('patient__user').order_by('-operation_date')[:INLINE_DETAIL_ROWS],
+        to_attr='recent_operations'
+    ))
+    return render_paginated(request, 'admin_operations.html', 'doctor_operations', doctors)
 
 
 def admin_leaves(request):
-    """Admin view all doctor leaves."""
+    """Admin view all doctor leaves, summarised per doctor."""
     if not request.user.is_authenticated or request.user.role != 'admin':
         messages.error(request, 'Admin access required!')
         return redirect('login')
     
-    # Get all leaves grouped by doctor
-    leaves = DoctorLeave.objects.select_related('doctor__user').order_by('-created_at')
-    
-    # Group leaves by doctor
-    doctor_leaves = {}
-    for leave in leaves:
-        doctor = leave.doctor
-        if doctor not in doctor_leaves:
-            doctor_leaves[doctor] = {
-                'leaves': [],
-                'count': 0,
-                'approved_count': 0
-            }
-        doctor_leaves[doctor]['leaves'].append(leave)
-        doctor_leaves[doctor]['count'] += 1
-        if leave.status == 'approved':
-            doctor_leaves[doctor]['approved_count'] += 1
+    doctors = Doctor.objects.select_related('user').annotate(
+        leave_count=Count('leaves'),
+        approved_count=Count('leaves', filter=Q(leaves__status='approved')),
+        latest_leave=Max('leaves__created_at'),
+    ).filter(leave_count__gt=0)
+    
+    # ?doctor=<id> expands one doctor's full, paginated leave history
+    doctor = selected_doctor(request, doctors)
+    if doctor is not None:
+        leaves = DoctorLeave.objects.filter(doctor=doctor).order_by('-created_at')
+        return render_paginated(request, 'admin_leaves.html', 'leaves', leaves, {'selected_doctor': doctor})
     
-    return render(request, 'admin_leaves.html', {'doctor_leaves': doctor_leaves})
+    doctors = doctors.order_by('-latest_leave', 'id').prefetch_related(Prefetch(
+        'leaves',
+        queryset=DoctorLeave.objects.order_by('-created_at')[:INLINE_DETAIL_ROWS],
+        to_attr='recent_leaves'
+    ))
+    return render_paginated(request, 'admin_leaves.html', 'doctor_leaves', doctors)
 
 
 def admin_payments(request):
@@ -574,7 +584,7 @@ def admin_payments(request):
         return redirect('login')
     
     payments = Payment.objects.select_related('patient__user', 'invoice').order_by('-created_at')
-    return render(request, 'admin_payments.html', {'payments': payments})
+    return render_paginated(request, 'admin_payments.html', 'payments', payments)
 
 
 def admin_medical_records(request):
@@ -584,4 +594,4 @@ def admin_medical_records(request):
         return redirect('login')
     
     records = MedicalRecord.objects.select_related('patient__user', 'doctor__user').order_by('-created_at')
-    return render(request, 'admin_medical_records.html', {'records': records})
+    return render_paginated(request, 'admin_medical_records.html', 'records', records)
@@ -0,0 +1,107 @@
+"""
+Django management command to compare the JSON renderers and parsers on an API-sized payload.
+
+The payload is ``--items`` appointments (1,000 by default) serialized with
+the full ``AppointmentSerializer``, nested doctor and patient included. It
+is built from unsaved objects, so no database rows are needed.
+
+    python manage.py bench_json_renderers --items 1000 --repeat 50
+"""
+import io
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.models import User, Doctor, Patient, Appointment
+from core.serializers import AppointmentSerializer
+
+
+def build_payload(items, seed=42):
+    """Serialize ``items`` in-memory appointments spread over 50 doctors and 500 patients."""
+    rng = random.Random(seed)
+    created = timezone.make_aware(datetime(2026, 1, 1, 9))
+
+    def profile(model, pk, role, **fields):
+        user = User(
+            id=pk, username=f'{role}{pk}', first_name=f'First{pk}', last_name=f'Last{pk}',
+            email=f'{role}{pk}@hospital.com', role=role, date_joined=created,
+        )
+        return model(id=pk, user=user, created_at=created, updated_at=created, **fields)
+
+    doctors = [
+        profile(
+            Doctor, pk, 'doctor', specialty='Cardiology', qualification='MBBS, MD',
+            experience=pk % 30, license_number=f'LIC{pk:06d}',
+            consultation_fee=Decimal(rng.randrange(50000, 200000)) / 100,
+            total_earnings=Decimal(rng.randrange(10 ** 8)) / 100,
+        )
+        for pk in range(1, 51)
+    ]
+    patients = [
+        profile(Patient, pk, 'patient', gender='female', blood_type='O+', total_spent=Decimal('1234.50'))
+        for pk in range(1, 501)
+    ]
+    appointments = []
+    for pk in range(1, items + 1):
+        doctor, patient = rng.choice(doctors), rng.choice(patients)
+        appointments.append(Appointment(
+            id=pk, doctor=doctor, patient=patient,
+            appointment_date=created + timedelta(minutes=30 * pk), status='scheduled',
+            reason='Routine checkup', notes='', created_at=created, updated_at=created,
+        ))
+    context = {
+        'doctor_appointment_counts': {doctor.id: 20 for doctor in doctors},
+        'patient_appointment_counts': {patient.id: 2 for patient in patients},
+    }
+    return AppointmentSerializer(appointments, many=True, context=context).data
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, min(timings), statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Benchmark DRF's JSON renderer and parser against the orjson-backed ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000, help='Appointments in the payload.')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per renderer; best and median are shown.')
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        data = build_payload(options['items'])
+        backend = 'orjson' if renderers.orjson else 'stdlib json (orjson not installed)'
+        self.stdout.write(f"{options['items']} appointments, {repeat} runs, fast backend: {backend}")
+
+        rendered = {}
+        for name, renderer in (('drf', JSONRenderer()), ('fast', renderers.FastJSONRenderer())):
+            output, best, median = timed(lambda: renderer.render(data), repeat)
+            rendered[name] = output
+            self.stdout.write(
+                f'  render {name:<4} {best:8.2f} ms best {median:8.2f} ms median {len(output):>9} bytes'
+            )
+        for name, parser in (('drf', JSONParser()), ('fast', renderers.FastJSONParser())):
+            parsed, best, median = timed(lambda: parser.parse(io.BytesIO(rendered['drf'])), repeat)
+            self.stdout.write(f'  parse  {name:<4} {best:8.2f} ms best {median:8.2f} ms median')
+
+        # Both renderers must produce the same document
+        if JSONParser().parse(io.BytesIO(rendered['fast'])) != parsed:
+            raise CommandError('The fast renderer output differs from DRF\'s.')
+        amount = renderers.FastJSONRenderer().render({'total_revenue': Decimal('12345678901234567.89')})
+        if b'"12345678901234567.89"' not in amount:
+            raise CommandError(f'Decimal amounts are not rendered exactly: {amount!r}')
+
+        self.stdout.write(self.style.SUCCESS('Outputs match and Decimal amounts are exact.'))
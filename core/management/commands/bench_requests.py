@@ -0,0 +1,121 @@
+"""
+Django management command to measure API throughput against the configured database.
+
+Requests go through Django's WSGI handler, the same entry point gunicorn
+uses, so connections are opened, reused, closed or returned to the pool
+exactly as in production. ``--concurrency`` threads send ``--requests``
+requests in total, authenticated with a JWT of the first active user with
+``--role``. Run it against a populated database once per connection mode
+and compare requests per second:
+
+    DATABASE_CONN_MAX_AGE=0 python manage.py bench_requests --path /api/doctors/
+    python manage.py bench_requests --path /api/doctors/
+    DATABASE_POOL=True DATABASE_POOL_MAX_SIZE=8 python manage.py bench_requests --concurrency 8
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import metrics
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark requests per second for one GET endpoint through the WSGI handler'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/doctors/', help='Path (and query string) to request.')
+        parser.add_argument('--requests', type=int, default=500, help='Total number of requests.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Threads sending requests.')
+        parser.add_argument('--role', default='admin', help='Role of the user the requests are made as.')
+        parser.add_argument('--warmup', type=int, default=20, help='Requests sent before timing starts.')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(role=options['role'], is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError(f"No active {options['role']} user; run generate_data first.")
+        token = str(RefreshToken.for_user(user).access_token)
+        url = urlsplit(options['path'])
+        handler = WSGIHandler()
+
+        def environ():
+            env = {
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'HTTP_ACCEPT': 'application/json',
+            }
+            setup_testing_defaults(env)
+            return env
+
+        def request(_):
+            started = time.perf_counter()
+            status = []
+            response = handler(environ(), lambda code, headers, exc_info=None: status.append(code))
+            try:
+                for _chunk in response:
+                    pass
+            finally:
+                # Fires request_finished, which closes or returns the connection
+                response.close()
+            return time.perf_counter() - started, status[0]
+
+        opened = []
+        lock = threading.Lock()
+
+        def count_connection(sender, connection, **kwargs):
+            with lock:
+                opened.append(connection.alias)
+
+        database = connections['default'].settings_dict
+        mode = 'pooled' if settings.DATABASE_POOL and database['ENGINE'] == 'core.db.postgresql' else 'unpooled'
+        self.stdout.write(
+            f"{options['path']} as {user.username}: {options['requests']} requests, "
+            f"{options['concurrency']} threads, {database['ENGINE'].rsplit('.', 1)[-1]} {mode}, "
+            f"CONN_MAX_AGE={database['CONN_MAX_AGE']}"
+        )
+        if mode == 'pooled':
+            self.stdout.write(
+                f'  pool size {settings.DATABASE_POOL_MIN_SIZE}-{settings.DATABASE_POOL_MAX_SIZE}, '
+                f'timeout {settings.DATABASE_POOL_TIMEOUT}s'
+            )
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('  DEBUG is on; SQL logging slows every request down.'))
+
+        with ThreadPoolExecutor(max_workers=max(options['concurrency'], 1)) as executor:
+            list(executor.map(request, range(options['warmup'])))
+            waits_before = metrics.registry.snapshot()['db_pool_wait_seconds']
+            connection_created.connect(count_connection)
+            try:
+                started = time.perf_counter()
+                results = list(executor.map(request, range(options['requests'])))
+                elapsed = time.perf_counter() - started
+            finally:
+                connection_created.disconnect(count_connection)
+        waits_after = metrics.registry.snapshot()['db_pool_wait_seconds']
+
+        timings = sorted(duration * 1000 for duration, _status in results)
+        failures = [status for _duration, status in results if not status.startswith('200')]
+        self.stdout.write(f'  {len(results) / elapsed:10.1f} requests/s')
+        self.stdout.write(
+            f'  latency {statistics.median(timings):.1f} ms median, '
+            f'{timings[int(len(timings) * 0.95) - 1]:.1f} ms p95, {timings[-1]:.1f} ms max'
+        )
+        self.stdout.write(f'  {len(opened)} database connections opened by Django')
+        # Histogram states end with (sum, count)
+        total = sum(state[-2] for state in waits_after.values()) - sum(state[-2] for state in waits_before.values())
+        count = sum(state[-1] for state in waits_after.values()) - sum(state[-1] for state in waits_before.values())
+        if count:
+            self.stdout.write(f'  pool wait {total / count * 1000:.2f} ms mean over {count} checkouts')
+        if failures:
+            raise CommandError(f'{len(failures)} requests failed, e.g. {failures[0]}')
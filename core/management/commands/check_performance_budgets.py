@@ -0,0 +1,250 @@
+"""
+Django management command to check every GET route against its performance budget.
+
+A throwaway test database is created and seeded with ``generate_data``.
+Every HTML route and every API endpoint that answers GET is then requested
+through the test client as the matching role (admin, doctor or patient).
+For each one the command records the SQL query count, the rows fetched and
+the wall time, using ``core.profiling.QueryRecorder``. Routes served from
+the versioned cache (``CACHED_ROUTES``) get a second, ``(cold)`` entry
+measured with the cache cleared before every request. It fails when a route
+exceeds its entry in the budget file (``PERFORMANCE_BUDGETS_FILE``) or has
+no entry at all.
+
+    python manage.py check_performance_budgets            # check, exit 1 on failure
+    python manage.py check_performance_budgets --update   # rewrite the budget file
+"""
+import io
+import json
+import math
+import re
+import statistics
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import cache
+from core.models import User, Doctor, Patient, Appointment, Prescription, Invoice, Operation, DoctorLeave
+from core.profiling import QueryRecorder
+
+# Fixed data set every budget is measured against
+DATASET = {'doctors': 20, 'patients': 200, 'appointments': 2000, 'seed': 42}
+
+# Router basenames whose detail routes take a ``pk``
+DETAIL_MODELS = {
+    'users': User, 'doctors': Doctor, 'patients': Patient,
+    'appointments': Appointment, 'prescriptions': Prescription, 'invoices': Invoice,
+}
+
+# Routes that change state or only make sense interactively
+SKIPPED_ROUTES = {'logout', 'dashboard-clear-cache', 'api-root', 'populate_database', 'metrics'}
+
+# Query strings measured in addition to the bare route
+EXTRA_QUERIES = {
+    'admin_operations': ['doctor={operation_doctor}'],
+    'admin_leaves': ['doctor={leave_doctor}'],
+    'admin_doctors': ['search=cardio'],
+    'admin_patients': ['search=sharma', 'search=A%2B+ku'],
+    'doctors-list': ['search=cardio'],
+    'patients-list': ['search=sharma'],
+    'patients': ['page=2&fragment=1'],
+    'doctors-search-availability': ['specialty=Cardiology'],
+    'export': ['status=paid&doctor={operation_doctor}'],
+    'dashboard-revenue': ['granularity=week', 'granularity=day&doctor={operation_doctor}'],
+}
+
+# Routes answered from core.cache once warm; their cold path is budgeted too
+CACHED_ROUTES = {'doctor_dashboard', 'patient_dashboard'}
+
+# Headroom given when budgets are rewritten. Query counts get none; row
+# counts get a little because "today" shifts some rows between lists
+ROW_HEADROOM = 1.2
+TIME_HEADROOM = 3
+MIN_TIME_BUDGET_MS = 50
+
+
+def iter_get_routes(patterns=None, prefix=''):
+    """Yield ``(name, pattern text)`` for every route answering GET, admin site excluded."""
+    patterns = get_resolver().url_patterns if patterns is None else patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            yield from iter_get_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+            continue
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIPPED_ROUTES:
+            continue
+        text = prefix + str(pattern.pattern)
+        if 'format' in pattern.pattern.regex.groupindex:
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, 'actions', None)
+        view_class = getattr(callback, 'cls', None)
+        if actions is not None:
+            if 'get' not in actions:
+                continue
+        elif view_class is not None and not hasattr(view_class, 'get'):
+            continue
+        yield pattern.name, text
+
+
+def build_path(text, kwargs):
+    """Turn a route or regex pattern into a concrete path."""
+    text = re.sub(r'\(\?P<(\w+)>[^)]*\)', lambda match: str(kwargs[match.group(1)]), text)
+    text = re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(kwargs[match.group(1)]), text)
+    return '/' + text.replace('^', '').replace('$', '').replace('\\', '')
+
+
+def role_for(name):
+    for role in ('doctor', 'patient'):
+        if name.startswith(f'{role}_'):
+            return role
+    return 'admin'
+
+
+class Command(BaseCommand):
+    help = 'Measure query count, rows fetched and wall time of every GET route against the budget file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budgets', default=None, help='Budget file (default: PERFORMANCE_BUDGETS_FILE).')
+        parser.add_argument('--update', action='store_true', help='Rewrite the budget file from this run.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed requests per route; the median counts.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        budget_file = Path(options['budgets'] or settings.PERFORMANCE_BUDGETS_FILE)
+        budgets = {}
+        if budget_file.exists():
+            budgets = json.loads(budget_file.read_text())
+        elif not options['update']:
+            raise CommandError(f'{budget_file} does not exist; run with --update to create it.')
+        if budgets.get('dataset', DATASET) != DATASET:
+            raise CommandError(f'{budget_file} was measured against a different data set; run with --update.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Read replicas read from the test database, as under the test runner
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            call_command(
+                'generate_data', admin=True, anchor_date=timezone.localdate().isoformat(),
+                stdout=self.stdout if options['verbosity'] > 1 else io.StringIO(), **DATASET
+            )
+            results = self.measure(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['update']:
+            self.write_budgets(budget_file, results)
+            return
+        if not self.report(results, budgets.get('routes', {})):
+            raise SystemExit(1)
+
+    def measure(self, repeat):
+        users = {
+            'admin': User.objects.get(username='admin'),
+            'doctor': Doctor.objects.select_related('user').order_by('pk').first().user,
+            'patient': Patient.objects.select_related('user').order_by('pk').first().user,
+        }
+        clients = {}
+        for role, user in users.items():
+            client = Client()
+            client.force_login(user)
+            token = RefreshToken.for_user(user).access_token
+            clients[role] = (client, {'HTTP_AUTHORIZATION': f'Bearer {token}'})
+
+        kwargs = {
+            'operation_doctor': Operation.objects.order_by('pk').values_list('doctor_id', flat=True).first(),
+            'leave_doctor': DoctorLeave.objects.order_by('pk').values_list('doctor_id', flat=True).first(),
+            'resource': 'invoices',
+            'fmt': 'csv',
+        }
+        results = {}
+        for name, text in iter_get_routes():
+            basename = name.rsplit('-', 1)[0]
+            if basename in DETAIL_MODELS:
+                kwargs['pk'] = DETAIL_MODELS[basename].objects.order_by('pk').values_list('pk', flat=True).first()
+            path = build_path(text, kwargs)
+            role = role_for(name)
+            client, headers = clients[role]
+            for query in [''] + EXTRA_QUERIES.get(name, []):
+                url = f'{path}?{query.format(**kwargs)}' if query else path
+                results[f'{role} GET {url}'] = self.measure_route(client, headers, url, repeat)
+                if name in CACHED_ROUTES:
+                    results[f'{role} GET {url} (cold)'] = self.measure_route(client, headers, url, repeat, cold=True)
+        return results
+
+    def measure_route(self, client, headers, url, repeat, cold=False):
+        client.get(url, **headers)  # Warm up template and URL caches
+        timings = []
+        for _ in range(max(repeat, 1)):
+            if cold:
+                cache.clear()
+            with QueryRecorder() as recorder:
+                response = client.get(url, **headers)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            timings.append(recorder.wall_ms)
+        return {
+            'status': response.status_code,
+            'queries': recorder.query_count,
+            'rows': recorder.rows,
+            'ms': round(statistics.median(timings), 1),
+            'repeated': max(recorder.repeated().values(), default=1),
+        }
+
+    def report(self, results, budgets):
+        failures = 0
+        for key, result in results.items():
+            budget = budgets.get(key)
+            problems = []
+            if result['status'] >= 500:
+                problems.append(f"server error {result['status']}")
+            if budget is None:
+                problems.append('no budget')
+            else:
+                for metric in ('queries', 'rows', 'ms'):
+                    if result[metric] > budget[metric]:
+                        problems.append(f'{metric} {result[metric]} > {budget[metric]}')
+            line = (
+                f"{key}: {result['status']} {result['queries']} queries, "
+                f"{result['rows']} rows, {result['ms']} ms"
+            )
+            if problems:
+                failures += 1
+                if result['repeated'] > 2:
+                    problems.append(f"a statement ran {result['repeated']} times (N+1?)")
+                self.stdout.write(self.style.ERROR(f"{line}  [{'; '.join(problems)}]"))
+            elif self.verbosity > 1:
+                self.stdout.write(line)
+
+        for key in sorted(set(budgets) - set(results)):
+            self.stdout.write(self.style.WARNING(f'{key}: budgeted route no longer exists'))
+
+        if failures:
+            self.stdout.write(self.style.ERROR(f'{failures} of {len(results)} routes are over budget.'))
+            return False
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} routes are within budget.'))
+        return True
+
+    def write_budgets(self, budget_file, results):
+        routes = {
+            key: {
+                'queries': result['queries'],
+                'rows': math.ceil(result['rows'] * ROW_HEADROOM),
+                'ms': max(MIN_TIME_BUDGET_MS, round(result['ms'] * TIME_HEADROOM)),
+            }
+            for key, result in sorted(results.items())
+        }
+        budget_file.write_text(json.dumps({'dataset': DATASET, 'routes': routes}, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Wrote budgets for {len(routes)} routes to {budget_file}.'))
@@ -0,0 +1,450 @@
+"""
+Django management command to generate large, deterministic sample data sets.
+
+Rows are built in memory with explicit primary keys and written in batches
+with ``bulk_create`` (or ``COPY`` on PostgreSQL with ``--copy``), so related
+rows never need to be read back. Every user of a role shares one password
+hash computed up front. The same ``--seed`` and ``--anchor-date`` always
+produce the same data.
+
+    python manage.py generate_data --doctors 10000 --patients 1000000 --appointments 10000000 --copy
+"""
+import csv
+import io
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from collections import Counter
+from itertools import count as counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import cache
+from core.aggregates import rebuild_aggregates
+from core.availability import slot_start
+from core.counters import rebuild_counters
+from core.occupancy import rebuild_occupancy
+from core.revenue import rebuild_rollups
+from core.search import rebuild_search_index
+from core.models import (
+    User, Doctor, Patient, Appointment, Invoice, Prescription, DoctorSchedule,
+    DoctorLeave, Operation, Payment, MedicalRecord
+)
+
+SPECIALTIES = [
+    ('Cardiology', 'MD, DM Cardiology'),
+    ('Neurology', 'MD, DM Neurology'),
+    ('Orthopedics', 'MS Orthopedics'),
+    ('Pediatrics', 'MD Pediatrics'),
+    ('Dermatology', 'MD Dermatology'),
+    ('Ophthalmology', 'MS Ophthalmology'),
+    ('ENT', 'MS ENT'),
+    ('Gynecology', 'MD Gynecology'),
+    ('General Medicine', 'MD General Medicine'),
+    ('Psychiatry', 'MD Psychiatry'),
+]
+
+FIRST_NAMES = [
+    'Rajesh', 'Amit', 'Sanjay', 'Vikram', 'Anil', 'Priya', 'Anjali', 'Sneha', 'Pooja', 'Neha',
+    'Divya', 'Meera', 'Kavita', 'Sunita', 'Lakshmi', 'Arun', 'Krishna', 'Harish', 'Rahul', 'Rohan',
+    'Aarav', 'Aanya', 'Vihaan', 'Saanvi', 'Arjun', 'Ananya', 'Reyansh', 'Pari', 'Ayaan', 'Myra',
+]
+
+LAST_NAMES = [
+    'Sharma', 'Patel', 'Singh', 'Kumar', 'Gupta', 'Verma', 'Reddy', 'Joshi', 'Mehta', 'Shah',
+    'Iyer', 'Menon', 'Nair', 'Pillai', 'Kapoor', 'Malhotra', 'Khanna', 'Bose', 'Das', 'Jain',
+]
+
+# (condition, medications, instructions)
+CONDITIONS = [
+    ('Hypertension', 'Amlodipine 5mg once daily, Aspirin 75mg once daily', 'Low salt diet, regular exercise'),
+    ('Diabetes Type 2', 'Metformin 500mg twice daily', 'Low sugar diet, regular monitoring'),
+    ('Asthma', 'Salbutamol inhaler SOS, Budesonide 200mcg twice daily', 'Avoid dust, smoke'),
+    ('Arthritis', 'Ibuprofen 400mg thrice daily', 'Hot compress, gentle exercise'),
+    ('Migraine', 'Sumatriptan 50mg SOS', 'Avoid bright lights, stress'),
+    ('Back Pain', 'Diclofenac gel local application', 'Proper posture, physiotherapy'),
+    ('Anxiety', 'Escitalopram 10mg once daily', 'Meditation, breathing exercises'),
+    ('Thyroid', 'Thyroxine 50mcg once daily empty stomach', 'Regular sleep, balanced diet'),
+    ('Allergy', 'Cetirizine 10mg once daily', 'Avoid allergens'),
+    ('Anemia', 'Ferrous sulfate tablets, Folic acid', 'Iron-rich diet'),
+]
+
+BLOOD_TYPES = [code for code, _ in Patient.BLOOD_TYPE_CHOICES]
+GENDERS = [code for code, _ in Patient.GENDER_CHOICES]
+PAYMENT_METHODS = [code for code, _ in Payment.PAYMENT_METHOD_CHOICES]
+LEAVE_REASONS = ['Conference', 'Family function', 'Medical leave', 'Vacation', 'Training']
+WORKING_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+
+# Working hours of every generated doctor
+DAY_START_MINUTES = 9 * 60
+DAY_END_MINUTES = 17 * 60
+
+# Smallest span of weekdays the appointments are spread over
+MIN_WORKING_DAYS = 20
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic, high-volume sample data set with batched inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=30)
+        parser.add_argument('--patients', type=int, default=60)
+        parser.add_argument(
+            '--appointments', type=int, default=None,
+            help='Defaults to one appointment per generated patient.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--anchor-date', default=None,
+            help='YYYY-MM-DD the data is centred on (default: today). Fix it for byte-identical runs.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Load rows with COPY instead of INSERT (PostgreSQL only).'
+        )
+        parser.add_argument('--admin', action='store_true', help='Create the admin / admin123 superuser.')
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete all existing admin, doctor and patient users first.'
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires a PostgreSQL database.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.use_copy = options['copy']
+        anchor = parse_date(options['anchor_date']) if options['anchor_date'] else timezone.localdate()
+        if anchor is None:
+            raise CommandError('--anchor-date must be YYYY-MM-DD.')
+
+        if options['reset']:
+            User.objects.filter(role__in=['admin', 'doctor', 'patient']).delete()
+        if options['admin'] and not User.objects.filter(username='admin').exists():
+            User.objects.create_superuser(
+                username='admin', email='admin@hospital.com', password='admin123',
+                first_name='System', last_name='Administrator', role='admin'
+            )
+            self.stdout.write(self.style.SUCCESS('Admin user created: admin / admin123'))
+
+        doctors = self.generate_doctors(options['doctors'])
+        patient_ids = self.generate_patients(options['patients'])
+
+        if not doctors:
+            doctors = list(Doctor.objects.order_by('pk').values_list('pk', 'consultation_fee'))
+        if not patient_ids:
+            patient_ids = list(Patient.objects.order_by('pk').values_list('pk', flat=True))
+        appointments = options['appointments']
+        if appointments is None:
+            appointments = options['patients']
+        if appointments and doctors and patient_ids:
+            self.generate_appointments(appointments, doctors, patient_ids, anchor)
+        if options['doctors'] > 0:
+            self.generate_leaves(doctors, anchor)
+
+        if connection.vendor == 'postgresql':
+            # Explicit ids bypass the sequences; move them past the new rows
+            models = [
+                User, Doctor, Patient, DoctorSchedule, Appointment, Invoice, Prescription,
+                Payment, MedicalRecord, Operation, DoctorLeave,
+            ]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        with transaction.atomic():
+            rebuild_counters()
+        rebuild_aggregates()
+        rebuild_rollups()
+        rebuild_occupancy()
+        rebuild_search_index()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Sample data generation completed!'))
+
+    # Writing
+
+    def write(self, model, objects):
+        """Insert ``objects`` in batches; returns the number of rows written."""
+        total = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                total += self.flush(model, batch)
+                batch = []
+        if batch:
+            total += self.flush(model, batch)
+        return total
+
+    def flush(self, model, batch):
+        with transaction.atomic():
+            if self.use_copy:
+                self.copy(model, batch)
+            else:
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+        return len(batch)
+
+    def copy(self, model, batch):
+        fields = model._meta.concrete_fields
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            row = []
+            for field in fields:
+                value = field.get_db_prep_save(field.pre_save(obj, True), connection)
+                row.append('\\N' if value is None else value)
+            writer.writerow(row)
+
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        sql = (
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        )
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def timed(self, label, model, objects):
+        started = time.perf_counter()
+        count = self.write(model, objects)
+        self.stdout.write(f'{label}: {count} rows in {time.perf_counter() - started:.1f}s')
+
+    # Generators
+
+    def users(self, role, count, first_id, first_profile_id, password):
+        """Yield users named after the profile they will own, e.g. ``doctor12``."""
+        rng = self.rng
+        now = timezone.now()
+        for offset in range(count):
+            username = f'{role}{first_profile_id + offset}'
+            yield User(
+                id=first_id + offset, username=username, email=f'{username}@hospital.com',
+                password=password, role=role,
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                phone=f'+91{rng.randint(7000000000, 9999999999)}', date_joined=now,
+            )
+
+    def generate_doctors(self, count):
+        """Create doctors with weekday schedules; returns ``[(id, consultation_fee)]``."""
+        if count <= 0:
+            return []
+        rng = self.rng
+        first_user = next_id(User)
+        first_doctor = next_id(Doctor)
+        first_schedule = next_id(DoctorSchedule)
+        password = make_password('doctor123')
+        fees = [Decimal(rng.randrange(500, 2001, 50)) for _ in range(count)]
+
+        self.timed('Doctor users', User, self.users('doctor', count, first_user, first_doctor, password))
+
+        def doctors():
+            for offset in range(count):
+                specialty, qualification = rng.choice(SPECIALTIES)
+                yield Doctor(
+                    id=first_doctor + offset, user_id=first_user + offset,
+                    specialty=specialty, qualification=qualification,
+                    experience=rng.randint(1, 35),
+                    license_number=f'MD{first_doctor + offset:08d}',
+                    consultation_fee=fees[offset],
+                )
+        self.timed('Doctors', Doctor, doctors())
+
+        slots = (DAY_END_MINUTES - DAY_START_MINUTES) // settings.APPOINTMENT_SLOT_MINUTES
+        start = dt_time(DAY_START_MINUTES // 60, DAY_START_MINUTES % 60)
+        end = dt_time(DAY_END_MINUTES // 60, DAY_END_MINUTES % 60)
+
+        def schedules():
+            schedule_id = first_schedule
+            for offset in range(count):
+                for day in WORKING_DAYS:
+                    yield DoctorSchedule(
+                        id=schedule_id, doctor_id=first_doctor + offset, day=day,
+                        start_time=start, end_time=end, max_appointments=slots,
+                    )
+                    schedule_id += 1
+        self.timed('Doctor schedules', DoctorSchedule, schedules())
+
+        return [(first_doctor + offset, fees[offset]) for offset in range(count)]
+
+    def generate_patients(self, count):
+        """Create patients; returns their ids."""
+        if count <= 0:
+            return []
+        rng = self.rng
+        first_user = next_id(User)
+        first_patient = next_id(Patient)
+        password = make_password('patient123')
+
+        self.timed('Patient users', User, self.users('patient', count, first_user, first_patient, password))
+
+        def patients():
+            for offset in range(count):
+                condition = rng.choice(CONDITIONS)[0]
+                yield Patient(
+                    id=first_patient + offset, user_id=first_user + offset,
+                    gender=rng.choice(GENDERS), blood_type=rng.choice(BLOOD_TYPES),
+                    emergency_contact=f'+91{rng.randint(7000000000, 9999999999)}',
+                    emergency_contact_name=rng.choice(FIRST_NAMES),
+                    medical_history=condition,
+                    allergies='None' if rng.random() > 0.3 else rng.choice(['Penicillin', 'Aspirin', 'Pollen', 'Dust']),
+                )
+        self.timed('Patients', Patient, patients())
+        return range(first_patient, first_patient + count)
+
+    def generate_appointments(self, count, doctors, patient_ids, anchor):
+        """
+        Create appointments with their invoices. Completed appointments also
+        get a prescription and a payment, and some get a medical record; about
+        2% of appointments lead to an operation.
+
+        Appointment ``n`` is the ``n // len(doctors)``-th booking of doctor
+        ``n % len(doctors)``. Each doctor's bookings are spread evenly over at
+        least ``MIN_WORKING_DAYS`` weekdays, one per slot, so slots never
+        collide. About 70% of the working days lie before ``anchor``.
+        """
+        rng = self.rng
+        step = settings.APPOINTMENT_SLOT_MINUTES
+        slots_per_day = (DAY_END_MINUTES - DAY_START_MINUTES) // step
+        per_doctor = -(-count // len(doctors))
+        days_needed = max(-(-per_doctor // slots_per_day), MIN_WORKING_DAYS)
+        total_slots = days_needed * slots_per_day
+
+        # Working days covered, oldest first: 70% before the anchor, the rest from it on
+        past = []
+        day = anchor
+        while len(past) < int(days_needed * 0.7):
+            day -= timedelta(days=1)
+            if day.weekday() < 5:
+                past.append(day)
+        working_days = past[::-1]
+        day = anchor
+        while len(working_days) < days_needed:
+            if day.weekday() < 5:
+                working_days.append(day)
+            day += timedelta(days=1)
+
+        first_appointment = next_id(Appointment)
+        first_invoice = next_id(Invoice)
+        ids = {model: counter(next_id(model)) for model in (Prescription, Payment, MedicalRecord, Operation)}
+        tz = timezone.get_current_timezone()
+        # Rows depending on the current batch of appointments, in insert order
+        children = {Invoice: [], Prescription: [], Payment: [], MedicalRecord: [], Operation: []}
+
+        def appointments():
+            for n in range(count):
+                doctor_id, fee = doctors[n % len(doctors)]
+                patient_id = patient_ids[rng.randrange(len(patient_ids))]
+                slot = (2 * (n // len(doctors)) + 1) * total_slots // (2 * per_doctor)
+                minutes = DAY_START_MINUTES + (slot % slots_per_day) * step
+                day = working_days[slot // slots_per_day]
+                when = timezone.make_aware(
+                    datetime(day.year, day.month, day.day, minutes // 60, minutes % 60), tz
+                )
+                roll = rng.random()
+                if day < anchor:
+                    status = 'completed' if roll < 0.8 else ('cancelled' if roll < 0.92 else 'no_show')
+                else:
+                    status = 'cancelled' if roll < 0.05 else ('scheduled' if roll < 0.55 else 'confirmed')
+                condition, medications, instructions = CONDITIONS[rng.randrange(len(CONDITIONS))]
+                appointment_id = first_appointment + n
+                invoice_id = first_invoice + n
+
+                children[Invoice].append(Invoice(
+                    id=invoice_id, appointment_id=appointment_id, amount=fee,
+                    description=f'Consultation fee for {condition}',
+                    status={'completed': 'paid', 'cancelled': 'cancelled'}.get(status, 'pending'),
+                    paid_at=when if status == 'completed' else None,
+                ))
+                if status == 'completed':
+                    children[Prescription].append(Prescription(
+                        id=next(ids[Prescription]),
+                        appointment_id=appointment_id, created_by_id=doctor_id,
+                        medications=medications, dosage='As prescribed', instructions=instructions,
+                        notes=f'Patient presented with {condition}.',
+                    ))
+                    children[Payment].append(Payment(
+                        id=next(ids[Payment]), patient_id=patient_id, invoice_id=invoice_id,
+                        amount=fee, payment_method=rng.choice(PAYMENT_METHODS), status='completed',
+                        transaction_id=f'TXN{invoice_id:010d}', paid_at=when,
+                    ))
+                    if rng.random() < 0.5:
+                        children[MedicalRecord].append(MedicalRecord(
+                            id=next(ids[MedicalRecord]), patient_id=patient_id, doctor_id=doctor_id,
+                            appointment_id=appointment_id, diagnosis=condition, treatment=instructions,
+                            follow_up_date=day + timedelta(days=30),
+                        ))
+                if rng.random() < 0.02:
+                    children[Operation].append(Operation(
+                        id=next(ids[Operation]), operation_name=f'{condition} procedure',
+                        doctor_id=doctor_id, patient_id=patient_id,
+                        operation_date=when + timedelta(days=1), duration=rng.choice([30, 60, 90, 120]),
+                        status='completed' if day < anchor else 'scheduled',
+                    ))
+                yield Appointment(
+                    id=appointment_id, doctor_id=doctor_id, patient_id=patient_id,
+                    appointment_date=when, status=status,
+                    slot_start=slot_start(when) if status in Appointment.ACTIVE_STATUSES else None,
+                    reason=condition, notes=f'Follow-up for {condition}',
+                )
+
+        def flush_batch(batch):
+            written[Appointment] += self.flush(Appointment, batch)
+            for model, rows in children.items():
+                if rows:
+                    written[model] += self.flush(model, rows)
+                    rows.clear()
+
+        # Dependent rows are flushed right after the batch of appointments
+        # they belong to, keeping memory bounded
+        written = Counter()
+        started = time.perf_counter()
+        batch = []
+        for appointment in appointments():
+            batch.append(appointment)
+            if len(batch) >= self.batch_size:
+                flush_batch(batch)
+                batch = []
+        if batch:
+            flush_batch(batch)
+
+        self.stdout.write(
+            ', '.join(f'{model._meta.verbose_name_plural}: {written[model]}' for model in [Appointment, *children])
+            + f' rows in {time.perf_counter() - started:.1f}s'
+        )
+
+    def generate_leaves(self, doctors, anchor):
+        """Give every doctor a few past and upcoming leaves in mixed states."""
+        rng = self.rng
+        first_leave = next_id(DoctorLeave)
+
+        def leaves():
+            leave_id = first_leave
+            for doctor_id, _ in doctors:
+                for offset, status in ((-60, 'approved'), (-20, 'rejected'), (15, 'pending')):
+                    start = anchor + timedelta(days=offset + rng.randint(0, 10))
+                    yield DoctorLeave(
+                        id=leave_id, doctor_id=doctor_id, start_date=start,
+                        end_date=start + timedelta(days=rng.randint(0, 4)),
+                        reason=rng.choice(LEAVE_REASONS), status=status,
+                    )
+                    leave_id += 1
+        self.timed('Doctor leaves', DoctorLeave, leaves())
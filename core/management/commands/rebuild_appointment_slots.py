@@ -0,0 +1,39 @@
+"""
+Django management command to recompute Appointment.slot_start for every appointment.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.availability import assign_slots
+from core.models import Appointment
+from core.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Recompute the slot held by every appointment (e.g. after changing APPOINTMENT_SLOT_MINUTES)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            current = dict(Appointment.objects.values_list('id', 'slot_start'))
+            # Earlier bookings keep their slot when two now share one
+            rows = Appointment.objects.order_by('created_at', 'id').values_list(
+                'id', 'doctor_id', 'appointment_date', 'status'
+            )
+            slots, conflicts = assign_slots(rows.iterator())
+            changed = [pk for pk, slot in slots.items() if current[pk] != slot]
+
+            # Release every changed slot first so reassignments cannot collide
+            for start in range(0, len(changed), 500):
+                Appointment.objects.filter(id__in=changed[start:start + 500]).update(slot_start=None)
+            Appointment.objects.bulk_update(
+                [Appointment(id=pk, slot_start=slots[pk]) for pk in changed if slots[pk]],
+                ['slot_start'], batch_size=500
+            )
+            rebuild_occupancy()
+
+        self.stdout.write(self.style.SUCCESS(f'Updated the slot of {len(changed)} appointments.'))
+        if conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'{len(conflicts)} active appointments share a slot with an earlier booking '
+                f'and hold none: {", ".join(map(str, conflicts))}'
+            ))
@@ -0,0 +1,37 @@
+"""
+Django management command to rebuild the dashboard counters from the live tables.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import find_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard counters and report any drift from the live tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift; do not modify the counters. Exits with status 1 on drift.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+        else:
+            with transaction.atomic():
+                drift = rebuild_counters()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Dashboard counters match the live tables.'))
+            return
+
+        for key in sorted(drift):
+            stored, live = drift[key]
+            self.stdout.write(f'{key}: stored={stored} live={live} drift={stored - live}')
+
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters have drifted.'))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters; fixed {len(drift)} drifted values.'))
@@ -0,0 +1,38 @@
+"""
+Django management command to rebuild the revenue rollups from the paid invoices.
+
+Months are rebuilt one transaction at a time, oldest first, so reports stay
+available while it runs. Without a range every month with paid invoices is
+rebuilt.
+
+    python manage.py rebuild_revenue_rollups
+    python manage.py rebuild_revenue_rollups --start 2025-01-01 --end 2025-12-31
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.revenue import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the day and month revenue rollups from the paid invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD); its whole month is rebuilt.')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD); its whole month is rebuilt.')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                dates[name] = parse_date(options[name])
+                if dates[name] is None:
+                    raise CommandError(f'--{name} must be YYYY-MM-DD.')
+
+        started = time.perf_counter()
+        months, rows = rebuild_rollups(**dates)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {months} months of revenue rollups ({rows} rows) in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,30 @@
+"""
+Django management command to rebuild the doctor and patient search index.
+
+Recomputes every profile's ``search_document`` in primary-key batches, then
+recreates any missing index (the SQLite FTS5 table and its triggers, or the
+PostgreSQL GIN indexes) and refills the FTS5 table. Run it after bulk
+imports, raw SQL, or a migration that rebuilt a profile table on SQLite.
+
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --batch-size 5000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute the doctor and patient search documents and rebuild their indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Profiles recomputed per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rewritten = rebuild_search_index(max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rewrote {rewritten} search documents and rebuilt the index in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,55 @@
+"""
+Django management command to repair drift in the stored doctor and patient totals.
+
+Profiles are processed in primary-key batches; each batch is locked, compared
+with the live appointment, invoice and payment tables and rewritten where it
+disagrees, so the command can run while the application is serving traffic.
+
+    python manage.py reconcile_aggregates                 # repair drift
+    python manage.py reconcile_aggregates --check         # report only, exit 1 on drift
+    python manage.py reconcile_aggregates --model doctor -v 2
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core.aggregates import AGGREGATE_MODELS, reconcile
+
+MODELS = {model._meta.model_name: model for model in AGGREGATE_MODELS}
+
+
+class Command(BaseCommand):
+    help = 'Recompute doctor and patient totals in batches and report any drift from the live tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift; do not modify the totals. Exits with status 1 on drift.'
+        )
+        parser.add_argument('--model', choices=sorted(MODELS), help='Only reconcile this profile type.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Profiles locked and compared at a time.')
+
+    def handle(self, *args, **options):
+        models = [MODELS[options['model']]] if options['model'] else AGGREGATE_MODELS
+        drifted = 0
+        for model in models:
+            checked = 0
+            fields = Counter()
+            for batch_checked, drift in reconcile(model, max(options['batch_size'], 1), fix=not options['check']):
+                checked += batch_checked
+                drifted += len(drift)
+                for pk, changed in sorted(drift.items()):
+                    fields.update(changed.keys())
+                    if options['verbosity'] >= 2:
+                        for field, (stored, live) in changed.items():
+                            self.stdout.write(f'{model._meta.model_name} {pk} {field}: stored={stored} live={live}')
+            summary = ', '.join(f'{field} drifted in {total}' for field, total in sorted(fields.items())) or 'no drift'
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {checked} checked, {summary}')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Stored totals match the live tables.'))
+            return
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f'{drifted} profiles have drifted.'))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} drifted profiles.'))
@@ -0,0 +1,224 @@
+"""
+Prometheus-style metrics without external dependencies.
+
+Each process keeps its counters and histograms in memory. When
+``METRICS_DIR`` is set (required under multi-worker gunicorn), every
+process also snapshots its values to ``<METRICS_DIR>/metrics-<pid>.json``
+at most every ``METRICS_FLUSH_SECONDS`` and at exit. ``/metrics`` then sums
+the snapshots of all workers, so any worker can answer a scrape. Snapshots
+of exited workers are kept so that counters never go backwards; clear the
+directory when the service restarts.
+
+Instrumentation points:
+
+* ``core.middleware.MetricsMiddleware``: request count and latency per URL
+  name, and DB queries per request,
+* ``core.authentication.TimedJWTAuthentication``: JWT authentication time,
+* ``InstrumentedDjangoTemplates``: template render time,
+* ``record_cache``: cache hits and misses, reported by the caching helpers,
+* ``core.db.postgresql``: connection pool wait time and timeouts.
+"""
+import atexit
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by URL name, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by URL name.', LATENCY_BUCKETS),
+    'db_queries_total': ('counter', 'SQL queries by URL name.', None),
+    'db_queries_per_request': ('histogram', 'SQL queries per request by URL name.', COUNT_BUCKETS),
+    'db_query_duration_seconds': ('histogram', 'Time spent in SQL per request by URL name.', LATENCY_BUCKETS),
+    'cache_requests_total': ('counter', 'Cache lookups by cache name and result (hit/miss).', None),
+    'db_pool_wait_seconds': ('histogram', 'Time spent waiting for a pooled connection by database alias.', FAST_BUCKETS),
+    'db_pool_timeouts_total': ('counter', 'Pooled connection requests that timed out by database alias.', None),
+    'jwt_authentication_duration_seconds': ('histogram', 'Time to authenticate a JWT bearer token.', FAST_BUCKETS),
+    'template_render_duration_seconds': ('histogram', 'Template render time by template name.', LATENCY_BUCKETS),
+}
+
+
+def _key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+class Registry:
+    """Thread-safe in-process store of metric values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in METRICS}
+        self._last_flush = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = _key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = _key(labels)
+        with self._lock:
+            series = self._values[name]
+            # Non-cumulative bucket counts, then +Inf, sum and count
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-2] += value
+            state[-1] += 1
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+    def maybe_flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self.snapshot())
+        # Write then rename so readers never see a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(data)
+        os.replace(tmp_path, directory / f'metrics-{os.getpid()}.json')
+
+
+registry = Registry()
+atexit.register(registry.maybe_flush, force=True)
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, labels, value)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, labels, value)
+
+
+def record_cache(cache_name, hit):
+    """Count one lookup in ``cache_name`` as a hit or a miss."""
+    registry.inc('cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def collect():
+    """Return the metric values of every worker, summed."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return registry.snapshot()
+
+    registry.maybe_flush(force=True)
+    merged = {name: {} for name in METRICS}
+    for path in Path(directory).glob('metrics-*.json'):
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, series in snapshot.items():
+            if name not in merged:
+                continue
+            for key, value in series.items():
+                current = merged[name].get(key)
+                if current is None:
+                    merged[name][key] = value
+                elif isinstance(value, list):
+                    merged[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][key] = current + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(values):
+    """Render metric values in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(values.get(name, {}).items()):
+            pairs = [tuple(pair) for pair in json.loads(key)]
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(pairs)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-2]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(pairs + [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(pairs)} {value[-2]}')
+            lines.append(f'{name}_count{_format_labels(pairs)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Serve all metrics to ``Authorization: Bearer <METRICS_TOKEN>``, or to a
+    logged-in admin. Without a token set only admins are served.
+    """
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    )
+    user = getattr(request, 'user', None)
+    if not authorized and not (user and user.is_authenticated and (user.is_staff or user.role == 'admin')):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class InstrumentedTemplate(Template):
+    """Template wrapper that records its render time."""
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            observe(
+                'template_render_duration_seconds', time.perf_counter() - started,
+                template=self.template.origin.template_name or self.template.origin.name
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
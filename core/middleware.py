@@ -0,0 +1,139 @@
+"""
+Custom middleware for Hospital Management System.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import db_router, metrics
+from .profiling import QueryRecorder
+
+logger = logging.getLogger('core.profiling')
+
+
+class QueryProfilingMiddleware:
+    """
+    Profile the SQL run by each request (opt-in with ``SQL_PROFILING=True``).
+
+    Adds a ``Server-Timing`` header (query count, DB time, duplicated
+    statements, slowest statement and total time) and logs one key=value
+    line per request through the ``core.profiling`` logger. Requests faster
+    than ``SQL_PROFILING_LOG_MS`` are not logged. Queries run while a
+    streaming response is consumed are not included.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        duplicates = recorder.repeated()
+        slowest = recorder.slowest()
+        slowest_ms = slowest['ms'] if slowest else 0.0
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.sql_ms:.2f};desc="{recorder.query_count} queries"',
+            f'db-dup;desc="{sum(duplicates.values()) - len(duplicates)} duplicate queries"',
+            f'db-slowest;dur={slowest_ms:.2f}',
+            f'total;dur={recorder.wall_ms:.2f}',
+        ])
+
+        if recorder.wall_ms >= settings.SQL_PROFILING_LOG_MS:
+            top_duplicate = max(duplicates.items(), key=lambda item: item[1], default=None)
+            logger.info(
+                'sql_profile method=%s path=%s status=%s queries=%d db_ms=%.2f total_ms=%.2f '
+                'duplicates=%d slowest_ms=%.2f slowest_sql="%s" top_duplicate="%s"',
+                request.method, request.path, response.status_code, recorder.query_count,
+                recorder.sql_ms, recorder.wall_ms, sum(duplicates.values()) - len(duplicates),
+                slowest_ms, _clip(slowest['sql']) if slowest else '',
+                f'{top_duplicate[1]}x {_clip(top_duplicate[0])}' if top_duplicate else '',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record request count and latency per URL name, plus the queries each
+    request runs, in ``core.metrics`` (disable with ``METRICS_ENABLED=False``).
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {'queries': 0, 'seconds': 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['seconds'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        wrapped = connections.all()
+        for connection in wrapped:
+            connection.execute_wrappers.append(count_query)
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(count_query)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.view_name if match else None) or 'unmatched'
+        metrics.inc('http_requests_total', view=view, method=request.method, status=response.status_code)
+        metrics.observe('http_request_duration_seconds', elapsed, view=view, method=request.method)
+        metrics.inc('db_queries_total', stats['queries'], view=view)
+        metrics.observe('db_queries_per_request', stats['queries'], view=view)
+        metrics.observe('db_query_duration_seconds', stats['seconds'], view=view)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the database reads of GET, HEAD and OPTIONS requests to the read
+    replicas (see ``core.db_router``; unused without ``DATABASE_REPLICA_URLS``).
+    
+    A request that writes anything, or uses another method, pins the client
+    to the primary for ``REPLICA_PIN_SECONDS`` through a cookie, so the page
+    or poll that follows sees the write even if the replicas lag.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    PIN_COOKIE = 'pin_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_only = request.method in self.SAFE_METHODS
+        state = db_router.RoutingState(use_replicas=read_only and self.PIN_COOKIE not in request.COOKIES)
+        with db_router.routing(state):
+            response = self.get_response(request)
+
+        if state.wrote or not read_only:
+            response.set_cookie(
+                self.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        if response.streaming:
+            response.streaming_content = db_router.stream_with(state, response.streaming_content)
+        return response
+
+
+def _clip(sql, length=200):
+    sql = ' '.join(sql.split()).replace('"', "'")
+    return sql if len(sql) <= length else sql[:length - 3] + '...'
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copies of core.availability, so later changes there cannot alter
+# what this migration does
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+
+def slot_start(value):
+    """Return the local datetime of the slot that ``value`` falls in."""
+    local = timezone.localtime(value) if timezone.is_aware(value) else value
+    minute = (local.hour * 60 + local.minute) // settings.APPOINTMENT_SLOT_MINUTES * settings.APPOINTMENT_SLOT_MINUTES
+    return local.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
+
+
+def fill_slot_start(apps, schema_editor):
+    """
+    Give existing active appointments their slot. The earliest booking of a
+    slot keeps it; later double bookings are cancelled, with a note naming
+    the booking that kept the slot, and listed on the console.
+    """
+    Appointment = apps.get_model('core', 'Appointment')
+    rows = Appointment.objects.filter(status__in=ACTIVE_STATUSES).order_by('created_at', 'id').values_list(
+        'id', 'doctor_id', 'appointment_date'
+    )
+    holders = {}
+    conflicts = {}
+    for pk, doctor_id, appointment_date in rows.iterator():
+        key = (doctor_id, slot_start(appointment_date))
+        if key in holders:
+            conflicts[pk] = holders[key]
+        else:
+            holders[key] = pk
+
+    Appointment.objects.bulk_update(
+        [Appointment(id=pk, slot_start=slot) for (_, slot), pk in holders.items()],
+        ['slot_start'], batch_size=500
+    )
+    for appointment in Appointment.objects.filter(pk__in=conflicts).only('id', 'notes'):
+        note = f'Cancelled: the slot was already booked by appointment #{conflicts[appointment.pk]}.'
+        appointment.status = 'cancelled'
+        appointment.notes = f'{appointment.notes}\n{note}' if appointment.notes else note
+        appointment.save(update_fields=['status', 'notes', 'updated_at'])
+    if conflicts:
+        print(
+            f'\n  Cancelled {len(conflicts)} double-booked appointments: '
+            f'{", ".join(map(str, sorted(conflicts)))}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='slot_start',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_slot_start, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('doctor', 'slot_start'), name='appt_doctor_slot_uniq'),
+        ),
+    ]
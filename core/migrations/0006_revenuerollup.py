@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core.revenue import rebuild_rollups
+
+
+def build_rollups(apps, schema_editor):
+    """Roll up the invoices paid before the table existed."""
+    rebuild_rollups(
+        invoice_model=apps.get_model('core', 'Invoice'),
+        payment_model=apps.get_model('core', 'Payment'),
+        rollup_model=apps.get_model('core', 'RevenueRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_appointment_slot_start'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period', models.DateField(help_text='First day of the period; weeks start on Monday')),
+                ('specialty', models.CharField(max_length=100)),
+                ('payment_method', models.CharField(blank=True, max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoices', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='core.doctor')),
+            ],
+            options={
+                'verbose_name': 'Revenue Rollup',
+                'verbose_name_plural': 'Revenue Rollups',
+                'ordering': ['granularity', 'period'],
+                'indexes': [models.Index(fields=['doctor', 'granularity', 'period'], name='revenue_doctor_period_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'period', 'doctor', 'payment_method'), name='revenue_rollup_uniq'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:54
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copies of core.search and the models' SEARCH_FIELDS, so later
+# changes there cannot alter what this migration does
+SEARCH_FIELDS = {
+    'Doctor': ('user__first_name', 'user__last_name', 'user__email', 'specialty', 'qualification'),
+    'Patient': ('user__first_name', 'user__last_name', 'user__email', 'user__phone', 'blood_type'),
+}
+
+POSTGRESQL_INDEX = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (to_tsvector('simple', search_document))",
+    'CREATE INDEX IF NOT EXISTS {table}_search_trgm_idx ON {table} USING gin (search_document gin_trgm_ops)',
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS {table}_search_idx',
+    'DROP INDEX IF EXISTS {table}_search_trgm_idx',
+)
+
+SQLITE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(search_document, content='{table}', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN '
+    'INSERT INTO {fts}(rowid, search_document) VALUES (new.id, new.search_document); END',
+    'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN '
+    "INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF search_document ON {table} BEGIN '
+    "INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    'INSERT INTO {fts}(rowid, search_document) VALUES (new.id, new.search_document); END',
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS {fts}_insert',
+    'DROP TRIGGER IF EXISTS {fts}_delete',
+    'DROP TRIGGER IF EXISTS {fts}_update',
+    'DROP TABLE IF EXISTS {fts}',
+)
+
+
+def search_document(profile, fields):
+    values = []
+    for path in fields:
+        value = profile
+        for name in path.split('__'):
+            value = getattr(value, name)
+        values.append(str(value or ''))
+    return ' '.join(re.findall(r'\w+', ' '.join(values).lower()))
+
+
+def execute(connection, statements, apps):
+    """Run the ``{vendor: statements}`` matching ``connection`` for both profile tables."""
+    statements = statements.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA compile_options')
+            if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+                return
+        for name in SEARCH_FIELDS:
+            table = apps.get_model('core', name)._meta.db_table
+            for sql in statements:
+                cursor.execute(sql.format(table=table, fts=f'{table}_search'))
+
+
+def build_search_index(apps, schema_editor):
+    """Fill the documents of existing profiles, then index them."""
+    for name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('core', name)
+        profiles = model.objects.select_related('user').only('search_document', *fields).order_by('pk')
+        batch = []
+        for profile in profiles.iterator(chunk_size=1000):
+            profile.search_document = search_document(profile, fields)
+            batch.append(profile)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['search_document'])
+                batch = []
+        model.objects.bulk_update(batch, ['search_document'])
+    execute(schema_editor.connection, {'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}, apps)
+
+
+def drop_search_index(apps, schema_editor):
+    execute(schema_editor.connection, {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core.occupancy import rebuild_occupancy
+
+
+def build_occupancy(apps, schema_editor):
+    """Record the bookings and leave made before the table existed."""
+    rebuild_occupancy(
+        appointment_model=apps.get_model('core', 'Appointment'),
+        leave_model=apps.get_model('core', 'DoctorLeave'),
+        occupancy_model=apps.get_model('core', 'DoctorDayOccupancy'),
+        doctor_model=apps.get_model('core', 'Doctor'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked', models.TextField(blank=True)),
+                ('on_leave', models.BooleanField(default=False)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_occupancy', to='core.doctor')),
+            ],
+            options={
+                'verbose_name': 'Doctor Day Occupancy',
+                'verbose_name_plural': 'Doctor Day Occupancy',
+                'ordering': ['doctor', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='doctordayoccupancy',
+            constraint=models.UniqueConstraint(fields=('doctor', 'date'), name='occupancy_doctor_date_uniq'),
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
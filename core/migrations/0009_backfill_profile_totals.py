@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from core.aggregates import rebuild_aggregates
+
+
+def backfill_totals(apps, schema_editor):
+    """Compute the doctor and patient totals of profiles created before the signals kept them."""
+    rebuild_aggregates(
+        doctor_model=apps.get_model('core', 'Doctor'),
+        patient_model=apps.get_model('core', 'Patient'),
+        appointment_model=apps.get_model('core', 'Appointment'),
+        invoice_model=apps.get_model('core', 'Invoice'),
+        payment_model=apps.get_model('core', 'Payment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_doctordayoccupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backfill_profile_totals'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_doctor_active_idx',
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='core.patient'),
+        ),
+        migrations.AlterField(
+            model_name='doctordayoccupancy',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='day_occupancy', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='doctorleave',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='medical_records', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='medical_records', to='core.patient'),
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='operations', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.patient'),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prescriptions', to='core.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='revenuerollup',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='core.doctor'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 """
 Database models for Hospital Management System.
 """
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -36,7 +38,72 @@ class User(AbstractUser):
         return f"{self.first_name} {self.last_name}".strip() or self.username
 
 
-class Doctor(models.Model):
+def _skip_aggregate_fields(instance, kwargs):
+    """
+    Leave the denormalized totals out of a plain save of an existing profile,
+    so a stale in-memory copy cannot overwrite concurrent F() updates.
+    """
+    if instance._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in instance.AGGREGATE_FIELDS
+    ]
+
+
+def search_words(text):
+    """Split ``text`` into the lowercased words search documents and queries are made of."""
+    return re.findall(r'\w+', text.lower())
+
+
+def search_document(instance, fields=None):
+    """
+    Return the search document of a profile: the words of its
+    ``SEARCH_FIELDS`` (``user__`` paths read the linked user), in order.
+    """
+    values = []
+    for path in fields or instance.SEARCH_FIELDS:
+        value = instance
+        for name in path.split('__'):
+            value = getattr(value, name)
+        values.append(str(value or ''))
+    return ' '.join(search_words(' '.join(values)))
+
+
+def _refresh_search_document(instance, kwargs):
+    """Rebuild the search document unless ``update_fields`` leaves out every field it is made of."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None:
+        if not {path for path in instance.SEARCH_FIELDS if '__' not in path}.intersection(update_fields):
+            return
+        kwargs['update_fields'] = {*update_fields, 'search_document'}
+    instance.search_document = search_document(instance)
+
+
+class LoadedValuesMixin:
+    """
+    Keep the field values an instance was read with in ``_loaded_values``,
+    keyed by attname, so ``core.signals`` can tell what a save or delete
+    changed without snapshotting every row in ``post_init``.
+    """
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        fields = None if fields is None else list(fields)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        refreshed = {
+            field.attname: self.__dict__[field.attname] for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (fields is None or {field.name, field.attname} & set(fields))
+        }
+        self._loaded_values = {**(getattr(self, '_loaded_values', None) or {}), **refreshed}
+
+
+class Doctor(LoadedValuesMixin, models.Model):
     """Doctor profile linked to User model."""
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='doctor_profile')
@@ -50,6 +117,7 @@ class Doctor(models.Model):
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Total money earned
     total_patients = models.IntegerField(default=0)  # Total patients treated
     total_appointments = models.IntegerField(default=0)  # Total appointments
+    search_document = models.TextField(blank=True, editable=False)  # Indexed by core.search
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -58,11 +126,21 @@ class Doctor(models.Model):
         verbose_name = 'Doctor'
         verbose_name_plural = 'Doctors'
     
+    # Maintained with F() updates by core.aggregates
+    AGGREGATE_FIELDS = ('total_earnings', 'total_patients', 'total_appointments')
+    # Copied into search_document
+    SEARCH_FIELDS = ('user__first_name', 'user__last_name', 'user__email', 'specialty', 'qualification')
+    
     def __str__(self):
         return f"Dr. {self.user.get_full_name} - {self.specialty}"
+    
+    def save(self, *args, **kwargs):
+        _refresh_search_document(self, kwargs)
+        _skip_aggregate_fields(self, kwargs)
+        super().save(*args, **kwargs)
 
 
-class Patient(models.Model):
+class Patient(LoadedValuesMixin, models.Model):
     """Patient profile linked to User model."""
     
     GENDER_CHOICES = (
@@ -88,6 +166,7 @@ class Patient(models.Model):
     current_condition = models.TextField(blank=True, help_text="Current health condition")
     treatment_notes = models.TextField(blank=True, help_text="Doctor's treatment notes")
     total_spent = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Total amount paid")
+    search_document = models.TextField(blank=True, editable=False)  # Indexed by core.search
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -96,11 +175,21 @@ class Patient(models.Model):
         verbose_name = 'Patient'
         verbose_name_plural = 'Patients'
     
+    # Maintained with F() updates by core.aggregates
+    AGGREGATE_FIELDS = ('total_spent',)
+    # Copied into search_document
+    SEARCH_FIELDS = ('user__first_name', 'user__last_name', 'user__email', 'user__phone', 'blood_type')
+    
     def __str__(self):
         return f"{self.user.get_full_name} - {self.user.email}"
+    
+    def save(self, *args, **kwargs):
+        _refresh_search_document(self, kwargs)
+        _skip_aggregate_fields(self, kwargs)
+        super().save(*args, **kwargs)
 
 
-class Appointment(models.Model):
+class Appointment(LoadedValuesMixin, models.Model):
     """Appointment booking between Doctor and Patient."""
     
     STATUS_CHOICES = (
@@ -111,10 +200,16 @@ class Appointment(models.Model):
         ('no_show', 'No Show'),
     )
     
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments')
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments')
+    ACTIVE_STATUSES = ('scheduled', 'confirmed')
+    
+    # Indexed by the composite indexes below, which lead with them
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments', db_index=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments', db_index=False)
     appointment_date = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    # Start of the booked slot while the appointment is active, NULL otherwise;
+    # unique per doctor so the database rejects double bookings
+    slot_start = models.DateTimeField(null=True, blank=True, editable=False)
     notes = models.TextField(blank=True)
     reason = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -124,9 +219,34 @@ class Appointment(models.Model):
         ordering = ['-appointment_date']
         verbose_name = 'Appointment'
         verbose_name_plural = 'Appointments'
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'slot_start'], name='appt_doctor_slot_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'appointment_date'], name='appt_doctor_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appt_patient_date_idx'),
+            models.Index(fields=['patient', 'status'], name='appt_patient_status_idx'),
+            models.Index(fields=['doctor', 'status'], name='appt_doctor_status_idx'),
+            models.Index(fields=['status'], name='appt_status_idx'),
+            models.Index(fields=['appointment_date'], name='appt_date_idx'),
+        ]
     
     def __str__(self):
         return f"Appointment #{self.id} - {self.doctor.user.username} with {self.patient.user.username}"
+    
+    def compute_slot_start(self):
+        """Return the slot this appointment holds, or None when it holds none."""
+        from .availability import slot_start
+        if self.status in self.ACTIVE_STATUSES and self.appointment_date:
+            return slot_start(self.appointment_date)
+        return None
+    
+    def save(self, *args, **kwargs):
+        self.slot_start = self.compute_slot_start()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'status', 'appointment_date'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'slot_start'}
+        super().save(*args, **kwargs)
 
 
 class Prescription(models.Model):
@@ -137,7 +257,10 @@ class Prescription(models.Model):
     dosage = models.CharField(max_length=200, help_text="Dosage instructions")
     instructions = models.TextField(help_text="Additional instructions")
     notes = models.TextField(blank=True)
-    created_by = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, related_name='prescriptions')
+    # Indexed by rx_doctor_created_idx
+    created_by = models.ForeignKey(
+        Doctor, on_delete=models.SET_NULL, null=True, related_name='prescriptions', db_index=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -145,12 +268,16 @@ class Prescription(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Prescription'
         verbose_name_plural = 'Prescriptions'
+        indexes = [
+            models.Index(fields=['created_at'], name='rx_created_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='rx_doctor_created_idx'),
+        ]
     
     def __str__(self):
         return f"Prescription for Appointment #{self.appointment_id}"
 
 
-class Invoice(models.Model):
+class Invoice(LoadedValuesMixin, models.Model):
     """Invoice linked to Appointment."""
     
     STATUS_CHOICES = (
@@ -173,6 +300,15 @@ class Invoice(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Invoice'
         verbose_name_plural = 'Invoices'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='invoice_status_created_idx'),
+            models.Index(fields=['created_at'], name='invoice_created_idx'),
+            models.Index(
+                fields=['paid_at'],
+                name='invoice_paid_at_idx',
+                condition=models.Q(status='paid'),
+            ),
+        ]
     
     def __str__(self):
         return f"Invoice #{self.id} - ${self.amount}"
@@ -182,7 +318,7 @@ class Invoice(models.Model):
 # NEW MODELS FOR ENHANCED FEATURES
 # ============================================
 
-class DoctorLeave(models.Model):
+class DoctorLeave(LoadedValuesMixin, models.Model):
     """Doctor leave/absence management."""
     
     STATUS_CHOICES = (
@@ -192,7 +328,8 @@ class DoctorLeave(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='leaves')
+    # Indexed by leave_doctor_created_idx
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='leaves', db_index=False)
     start_date = models.DateField()
     end_date = models.DateField()
     reason = models.TextField()
@@ -206,12 +343,16 @@ class DoctorLeave(models.Model):
         ordering = ['-start_date']
         verbose_name = 'Doctor Leave'
         verbose_name_plural = 'Doctor Leaves'
+        indexes = [
+            models.Index(fields=['doctor', 'created_at'], name='leave_doctor_created_idx'),
+            models.Index(fields=['status'], name='leave_status_idx'),
+        ]
     
     def __str__(self):
         return f"Leave: Dr. {self.doctor.user.get_full_name} - {self.start_date} to {self.end_date}"
 
 
-class Operation(models.Model):
+class Operation(LoadedValuesMixin, models.Model):
     """Operation/Surgery records."""
     
     STATUS_CHOICES = (
@@ -222,7 +363,8 @@ class Operation(models.Model):
     )
     
     operation_name = models.CharField(max_length=200)
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='operations')
+    # Indexed by op_doctor_date_idx
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='operations', db_index=False)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='operations')
     operation_date = models.DateTimeField()
     duration = models.IntegerField(help_text="Duration in minutes")
@@ -236,12 +378,16 @@ class Operation(models.Model):
         ordering = ['-operation_date']
         verbose_name = 'Operation'
         verbose_name_plural = 'Operations'
+        indexes = [
+            models.Index(fields=['doctor', 'operation_date'], name='op_doctor_date_idx'),
+            models.Index(fields=['operation_date'], name='op_date_idx'),
+        ]
     
     def __str__(self):
         return f"Operation: {self.operation_name} - {self.patient.user.get_full_name}"
 
 
-class Payment(models.Model):
+class Payment(LoadedValuesMixin, models.Model):
     """Payment records for patients."""
     
     STATUS_CHOICES = (
@@ -259,7 +405,8 @@ class Payment(models.Model):
         ('insurance', 'Insurance'),
     )
     
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='payments')
+    # Indexed by payment_patient_created_idx
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='payments', db_index=False)
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='payments', null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
@@ -273,6 +420,11 @@ class Payment(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            models.Index(fields=['patient', 'created_at'], name='payment_patient_created_idx'),
+            models.Index(fields=['created_at'], name='payment_created_idx'),
+        ]
     
     def __str__(self):
         return f"Payment #{self.id} - {self.patient.user.get_full_name} - ₹{self.amount}"
@@ -311,8 +463,9 @@ class DoctorSchedule(models.Model):
 class MedicalRecord(models.Model):
     """Patient medical records/history."""
     
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='medical_records')
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='medical_records')
+    # Indexed by record_patient_created_idx and record_doctor_created_idx
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='medical_records', db_index=False)
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='medical_records', db_index=False)
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, null=True, blank=True, related_name='medical_records')
     diagnosis = models.TextField(help_text="Diagnosis details")
     treatment = models.TextField(help_text="Treatment plan")
@@ -324,6 +477,86 @@ class MedicalRecord(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Medical Record'
         verbose_name_plural = 'Medical Records'
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='record_patient_created_idx'),
+            models.Index(fields=['doctor', 'created_at'], name='record_doctor_created_idx'),
+            models.Index(fields=['created_at'], name='record_created_idx'),
+        ]
     
     def __str__(self):
         return f"Medical Record - {self.patient.user.get_full_name} - {self.created_at.date()}"
+
+
+class DashboardCounter(models.Model):
+    """Incrementally maintained dashboard statistic (see core.counters)."""
+    
+    key = models.CharField(max_length=50, unique=True)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['key']
+        verbose_name = 'Dashboard Counter'
+        verbose_name_plural = 'Dashboard Counters'
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class RevenueRollup(models.Model):
+    """Paid invoice totals per day, week or month, doctor and payment method (see core.revenue)."""
+    
+    GRANULARITY_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+    
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period = models.DateField(help_text="First day of the period; weeks start on Monday")
+    # Indexed by revenue_doctor_period_idx
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='revenue_rollups', db_index=False)
+    specialty = models.CharField(max_length=100)
+    # Method of the invoice's latest completed payment; blank when none is recorded
+    payment_method = models.CharField(max_length=20, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoices = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['granularity', 'period']
+        verbose_name = 'Revenue Rollup'
+        verbose_name_plural = 'Revenue Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'period', 'doctor', 'payment_method'], name='revenue_rollup_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'granularity', 'period'], name='revenue_doctor_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.granularity} {self.period} - doctor #{self.doctor_id} - {self.payment_method or 'unrecorded'}: {self.total}"
+
+
+class DoctorDayOccupancy(models.Model):
+    """Booked slots and approved leave of a doctor on one day (see core.occupancy)."""
+    
+    # Indexed by occupancy_doctor_date_uniq
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='day_occupancy', db_index=False)
+    date = models.DateField()
+    # Start minutes (after local midnight) of the slots held by active appointments, comma-separated
+    booked = models.TextField(blank=True)
+    on_leave = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['doctor', 'date']
+        verbose_name = 'Doctor Day Occupancy'
+        verbose_name_plural = 'Doctor Day Occupancy'
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='occupancy_doctor_date_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"Dr. #{self.doctor_id} on {self.date}: {self.booked or 'no bookings'}{' (leave)' if self.on_leave else ''}"
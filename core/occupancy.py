@@ -0,0 +1,158 @@
+"""
+Stored per-day doctor occupancy.
+
+``DoctorDayOccupancy`` holds, for every doctor and day with bookings or
+approved leave, the start minutes of the slots held by active appointments
+and whether the doctor is on leave. The availability engine in
+``core.availability`` reads these rows instead of the appointment and leave
+tables: a 30-day search for hundreds of doctors reads one small row per
+booked doctor-day, with no datetime to convert.
+
+Rows are refreshed per (doctor, day) by the model signals in
+``core.signals`` whenever an appointment is booked, moved or cancelled, or a
+leave is approved or changed: the day is recomputed from the live tables
+once the writing transaction has committed, with the doctor row locked, like
+the revenue rollups. ``bulk_create()`` and ``QuerySet.update()`` bypass
+signals, so callers using them must call ``schedule_refresh`` themselves or
+run ``rebuild_occupancy`` afterwards.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Doctor, Appointment, DoctorLeave, DoctorDayOccupancy
+
+# Models feeding the occupancy rows and the fields it depends on
+TRACKED_FIELDS = {
+    Appointment: ('doctor_id', 'slot_start'),
+    DoctorLeave: ('doctor_id', 'status', 'start_date', 'end_date'),
+}
+TRACKED_MODELS = tuple(TRACKED_FIELDS)
+
+# Doctors rebuilt per transaction
+BATCH_SIZE = 500
+
+
+def state(instance):
+    """Return the values of the tracked fields of an appointment or leave."""
+    return tuple(getattr(instance, field) for field in TRACKED_FIELDS[type(instance)])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def affected_days(model, states):
+    """Return the ``(doctor_id, day)`` pairs the appointment or leave ``states`` occupy."""
+    if model is Appointment:
+        return {
+            (doctor_id, timezone.localdate(slot)) for doctor_id, slot in states if doctor_id and slot
+        }
+    return {
+        (doctor_id, day)
+        for doctor_id, status, start, end in states if doctor_id and status == 'approved'
+        for day in _days(start, end)
+    }
+
+
+def day_rows(doctor_ids, start, end, appointment_model=Appointment, leave_model=DoctorLeave):
+    """
+    Compute the occupancy of ``doctor_ids`` from ``start`` to ``end`` (dates,
+    inclusive) from the live tables: ``{(doctor_id, day): {'booked',
+    'on_leave'}}``, leaving out days with neither bookings nor leave.
+    """
+    booked = defaultdict(list)
+    tz = timezone.get_current_timezone()
+    slots = appointment_model.objects.filter(
+        doctor_id__in=doctor_ids, slot_start__gte=_day_start(start), slot_start__lt=_day_start(end + timedelta(days=1))
+    ).values_list('doctor_id', 'slot_start')
+    for doctor_id, slot in slots:
+        slot = slot.astimezone(tz)
+        booked[(doctor_id, slot.date())].append(slot.hour * 60 + slot.minute)
+
+    leave_days = set()
+    leaves = leave_model.objects.filter(
+        doctor_id__in=doctor_ids, status='approved', start_date__lte=end, end_date__gte=start
+    ).values_list('doctor_id', 'start_date', 'end_date')
+    for doctor_id, leave_start, leave_end in leaves:
+        leave_days.update((doctor_id, day) for day in _days(max(leave_start, start), min(leave_end, end)))
+
+    return {
+        key: {'booked': ','.join(map(str, sorted(booked.get(key, ())))), 'on_leave': key in leave_days}
+        for key in booked.keys() | leave_days
+    }
+
+
+def _replace(scope, rows, occupancy_model=DoctorDayOccupancy):
+    """Make the occupancy rows matching ``scope`` exactly ``rows``."""
+    existing = occupancy_model.objects.filter(scope).values_list('pk', 'doctor_id', 'date')
+    stale = [pk for pk, *key in existing if tuple(key) not in rows]
+    if stale:
+        occupancy_model.objects.filter(pk__in=stale).delete()
+    occupancy_model.objects.bulk_create(
+        [occupancy_model(doctor_id=doctor_id, date=day, **values) for (doctor_id, day), values in rows.items()],
+        batch_size=1000, update_conflicts=True, unique_fields=('doctor', 'date'), update_fields=('booked', 'on_leave'),
+    )
+
+
+def refresh(days):
+    """Recompute the occupancy of ``(doctor_id, day)`` pairs from the live tables."""
+    doctor_ids = {doctor_id for doctor_id, _ in days}
+    with transaction.atomic():
+        # Serializes the refreshes of a doctor's days
+        list(Doctor.objects.select_for_update().filter(pk__in=doctor_ids).values_list('pk'))
+        rows = day_rows(doctor_ids, min(day for _, day in days), max(day for _, day in days))
+        _replace(
+            reduce(or_, [Q(doctor_id=doctor_id, date=day) for doctor_id, day in days]),
+            {key: values for key, values in rows.items() if key in days},
+        )
+
+
+def schedule_refresh(model, states):
+    """Refresh the days the appointment or leave ``states`` occupy once the transaction commits."""
+    days = affected_days(model, states)
+    if days:
+        transaction.on_commit(lambda: refresh(days), robust=True)
+
+
+def rebuild_occupancy(start=None, end=None, appointment_model=Appointment, leave_model=DoctorLeave,
+                      occupancy_model=DoctorDayOccupancy, doctor_model=Doctor):
+    """
+    Recompute the occupancy of every doctor from ``start`` (default today)
+    to ``end`` (default the last booking or leave), ``BATCH_SIZE`` doctors per
+    transaction, and drop the rows of earlier days, which availability never
+    reads. Returns the rows written. The model arguments allow running it from
+    a migration with historical models.
+    """
+    start = start or timezone.localdate()
+    if end is None:
+        last_slot = appointment_model.objects.filter(slot_start__isnull=False).order_by('-slot_start').values_list(
+            'slot_start', flat=True
+        ).first()
+        last_leave = leave_model.objects.filter(status='approved').order_by('-end_date').values_list(
+            'end_date', flat=True
+        ).first()
+        end = max([timezone.localdate(last_slot) if last_slot else start, last_leave or start])
+
+    occupancy_model.objects.filter(date__lt=start).delete()
+    written = 0
+    doctor_ids = list(doctor_model.objects.order_by('pk').values_list('pk', flat=True))
+    for offset in range(0, len(doctor_ids), BATCH_SIZE):
+        batch = doctor_ids[offset:offset + BATCH_SIZE]
+        with transaction.atomic():
+            rows = day_rows(batch, start, end, appointment_model, leave_model)
+            _replace(Q(doctor_id__in=batch, date__gte=start), rows, occupancy_model)
+        written += len(rows)
+    return written
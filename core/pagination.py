@@ -0,0 +1,111 @@
+"""
+Pagination classes for Hospital Management System.
+"""
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination.
+
+    The cursor holds the values of every ``ordering`` field of the last row
+    seen, and the next page is fetched with ``WHERE (ordering) < (last seen)``
+    compared field by field, e.g. ``date < d OR (date = d AND id < i)``.
+    Unlike DRF's ``CursorPagination``, which only positions on the first
+    field and steps over ties with a growing ``OFFSET``, rows sharing a
+    timestamp cost nothing extra. No ``COUNT(*)`` is run either, so deep pages
+    cost the same as the first one. The ordering must end with a unique
+    field. Clients can pick a page size with ``?page_size=``.
+    """
+
+    page_size = settings.CURSOR_PAGE_SIZE
+    max_page_size = settings.CURSOR_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self._decode_position(self.cursor.position) if self.cursor else None
+
+        ordering = [self._flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(ordering, position))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next = position is not None if reverse else has_following
+        self.has_previous = has_following if reverse else position is not None
+        self.position = position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._position(self.page[-1]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=json.dumps(position)))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._position(self.page[0]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=json.dumps(position)))
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _decode_position(self, position):
+        if position is None:
+            return None
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _position(self, instance):
+        return [str(getattr(instance, field.lstrip('-'))) for field in self.ordering]
+
+    def _after(self, ordering, position):
+        """Return the filter for rows strictly after ``position`` in ``ordering``."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = [Q(**{other.lstrip('-'): value}) for other, value in zip(ordering[:index], position)]
+            conditions.append(reduce(and_, equal + [Q(**{f'{name}__{lookup}': position[index]})]))
+        return reduce(or_, conditions)
+
+
+class AppointmentCursorPagination(KeysetPagination):
+    ordering = ('-appointment_date', '-id')
+
+
+class CreatedAtCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,125 @@
+"""
+Per-request database profiling.
+
+``QueryRecorder`` hooks every database connection with
+``connection.execute_wrapper`` and records, for the code run inside it, the
+number of SQL queries, the rows fetched from their cursors and the time
+spent in the database. It has no effect on code outside the ``with`` block.
+
+    with QueryRecorder() as recorder:
+        client.get('/api/doctors/')
+    recorder.query_count, recorder.rows, recorder.sql_ms
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+# Placeholder lists such as "IN (%s, %s, %s)" collapse to one fingerprint
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalise a statement so repeats differing only in list length group together."""
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(...)', sql)).strip()
+
+
+class CountingCursor:
+    """Proxy for a DB-API cursor that counts the rows fetched through it."""
+
+    def __init__(self, cursor, query):
+        self._cursor = cursor
+        self._query = query
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._query['rows'] += 1
+            yield row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._query['rows'] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._query['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._query['rows'] += len(rows)
+        return rows
+
+
+class QueryRecorder:
+    """Record the queries run on every connection while the block executes."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+        self._wrapped = []
+
+    def __call__(self, execute, sql, params, many, context):
+        query = {'sql': sql, 'alias': context['connection'].alias, 'rows': 0, 'ms': 0.0}
+        self.queries.append(query)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            query['ms'] = (time.perf_counter() - started) * 1000
+            wrapper = context['cursor']
+            raw = wrapper.cursor
+            if isinstance(raw, CountingCursor):
+                raw = raw._cursor
+            wrapper.cursor = CountingCursor(raw, query)
+            self._wrapped.append((wrapper, raw))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_ms = (time.perf_counter() - self._started) * 1000
+        self._stack.close()
+        for wrapper, raw in self._wrapped:
+            wrapper.cursor = raw
+        self._wrapped = []
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def rows(self):
+        return sum(query['rows'] for query in self.queries)
+
+    @property
+    def sql_ms(self):
+        return sum(query['ms'] for query in self.queries)
+
+    def repeated(self, threshold=2):
+        """Return ``{fingerprint: count}`` for statements run at least ``threshold`` times (likely N+1)."""
+        counts = Counter(fingerprint(query['sql']) for query in self.queries)
+        return {sql: count for sql, count in counts.items() if count >= threshold}
+
+    def slowest(self):
+        """Return the slowest recorded query, or None."""
+        return max(self.queries, key=lambda query: query['ms'], default=None)
+
+    def summary(self):
+        return {
+            'queries': self.query_count,
+            'rows': self.rows,
+            'sql_ms': round(self.sql_ms, 2),
+        }
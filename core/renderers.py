@@ -0,0 +1,73 @@
+"""
+Fast JSON renderer and parser for the REST API.
+
+``FastJSONRenderer`` and ``FastJSONParser`` use orjson when it is installed
+(``pip install orjson``) and fall back to DRF's own JSON handling otherwise.
+Unlike DRF's ``JSONRenderer``, which turns ``Decimal`` values that reach it
+un-serialized (e.g. aggregates returned straight from a view) into floats,
+both paths write them as exact strings, the same way serializer
+``DecimalField``s already do.
+
+Requests for indented output (the browsable API, ``; indent=`` in the Accept
+header) also go through DRF's renderer, since orjson only indents by two.
+"""
+import json
+from decimal import Decimal
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ExactDecimalEncoder(JSONEncoder):
+    """DRF's JSON encoder, but writing ``Decimal`` as a string."""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+_encoder = ExactDecimalEncoder()
+
+# Datetimes are passed to the encoder too, so they are formatted exactly as
+# DRF does (millisecond precision, "Z" for UTC)
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+def dumps(data):
+    """Encode ``data`` as compact UTF-8 JSON, the way ``FastJSONRenderer`` does."""
+    if orjson is None:
+        return json.dumps(data, cls=ExactDecimalEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    return orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer backed by orjson when it is installed."""
+
+    encoder_class = ExactDecimalEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser backed by orjson when it is installed."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
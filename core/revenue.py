@@ -0,0 +1,289 @@
+"""
+Revenue rollups.
+
+``RevenueRollup`` holds the total and count of paid invoices per day, week
+and month, doctor and payment method, with the doctor's specialty stored
+alongside so reports can filter on it without a join. Revenue counts on the
+day an invoice is paid; its payment method is that of the invoice's latest
+completed payment, blank until one is recorded.
+
+Finance reports read these rows instead of the invoice table: a report over
+several years reads at most one row per doctor, payment method and period,
+however many invoices there are. Only partial periods at either end of a
+date range are summed from day rows.
+
+Rows are refreshed per (day, doctor) bucket by the model signals in
+``core.signals`` whenever an invoice or payment changes in a way that can
+move revenue: the bucket's day rows are recomputed from the live tables,
+then the week and month rows containing it from the day rows. Refreshes run once the
+writing transaction has committed, with the doctor row locked, so concurrent
+writers cannot leave a stale bucket behind. ``bulk_create()`` and
+``QuerySet.update()`` bypass signals, and changing a doctor's specialty does
+not touch past rows; run ``rebuild_revenue_rollups`` afterwards.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Doctor, Appointment, Invoice, Payment, RevenueRollup
+
+# Models feeding the rollups and the fields revenue depends on
+TRACKED_FIELDS = {
+    Invoice: ('appointment_id', 'status', 'amount', 'paid_at'),
+    Payment: ('invoice_id', 'status', 'payment_method'),
+}
+TRACKED_MODELS = tuple(TRACKED_FIELDS)
+
+GRANULARITIES = ('day', 'week', 'month')
+# Granularities summed from the day rows
+ROLLED_UP = ('week', 'month')
+
+UNIQUE_FIELDS = ('granularity', 'period', 'doctor', 'payment_method')
+UPDATE_FIELDS = ('specialty', 'total', 'invoices', 'updated_at')
+
+
+def state(instance):
+    """Return the values of the tracked fields of an invoice or payment."""
+    return tuple(getattr(instance, field) for field in TRACKED_FIELDS[type(instance)])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_start(granularity, day):
+    """Return the first day of the ``granularity`` period containing ``day``; weeks start on Monday."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(granularity, day):
+    """Return the first day of the period after the one starting on ``day``."""
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day + timedelta(days=32)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def affected_buckets(model, states):
+    """Return the ``(day, doctor_id)`` buckets the invoice or payment ``states`` count towards."""
+    if model is Invoice:
+        paid = {
+            (appointment_id, timezone.localdate(paid_at))
+            for appointment_id, status, _amount, paid_at in states
+            if status == 'paid' and paid_at
+        }
+        if not paid:
+            return set()
+        doctors = dict(Appointment.objects.filter(
+            pk__in={appointment_id for appointment_id, _ in paid}
+        ).values_list('pk', 'doctor_id'))
+        return {(day, doctors[appointment_id]) for appointment_id, day in paid if appointment_id in doctors}
+
+    invoice_ids = {invoice_id for invoice_id, status, _method in states if invoice_id and status == 'completed'}
+    if not invoice_ids:
+        return set()
+    return {
+        (timezone.localdate(paid_at), doctor_id)
+        for paid_at, doctor_id in Invoice.objects.filter(
+            pk__in=invoice_ids, status='paid', paid_at__isnull=False
+        ).values_list('paid_at', 'appointment__doctor_id')
+    }
+
+
+def day_rows(invoices, payment_model=Payment):
+    """
+    Group the paid ``invoices`` into day rollups:
+    ``{(day, doctor_id, payment method): {'specialty', 'total', 'invoices'}}``.
+    """
+    method = Coalesce(Subquery(
+        payment_model.objects.filter(
+            invoice=OuterRef('pk'), status='completed'
+        ).order_by('-paid_at', '-pk').values('payment_method')[:1]
+    ), Value(''))
+    rows = invoices.filter(status='paid', paid_at__isnull=False).annotate(
+        day=TruncDate('paid_at'), method=method
+    ).order_by().values('day', 'appointment__doctor_id', 'method').annotate(
+        doctor_specialty=Max('appointment__doctor__specialty'), amount=Sum('amount'), count=Count('pk')
+    )
+    return {
+        (row['day'], row['appointment__doctor_id'], row['method']): {
+            'specialty': row['doctor_specialty'], 'total': row['amount'], 'invoices': row['count'],
+        }
+        for row in rows
+    }
+
+
+def period_rows(granularity, period, doctor_ids=None, rollup_model=RevenueRollup):
+    """Sum the stored day rows of a week or month into rollups keyed like ``day_rows``."""
+    rows = rollup_model.objects.filter(
+        granularity='day', period__gte=period, period__lt=next_period(granularity, period)
+    )
+    if doctor_ids is not None:
+        rows = rows.filter(doctor_id__in=doctor_ids)
+    rows = rows.order_by().values('doctor_id', 'payment_method').annotate(
+        doctor_specialty=Max('specialty'), amount=Sum('total'), count=Sum('invoices')
+    )
+    return {
+        (period, row['doctor_id'], row['payment_method']): {
+            'specialty': row['doctor_specialty'], 'total': row['amount'], 'invoices': row['count'],
+        }
+        for row in rows
+    }
+
+
+def _replace(granularity, scope, rows, rollup_model=RevenueRollup):
+    """Make the ``granularity`` rollups matching ``scope`` exactly ``rows``."""
+    existing = rollup_model.objects.filter(scope, granularity=granularity).values_list(
+        'pk', 'period', 'doctor_id', 'payment_method'
+    )
+    stale = [pk for pk, *key in existing if tuple(key) not in rows]
+    if stale:
+        rollup_model.objects.filter(pk__in=stale).delete()
+    rollup_model.objects.bulk_create(
+        [
+            rollup_model(granularity=granularity, period=period, doctor_id=doctor_id, payment_method=method, **values)
+            for (period, doctor_id, method), values in rows.items()
+        ],
+        batch_size=1000, update_conflicts=True, unique_fields=UNIQUE_FIELDS, update_fields=UPDATE_FIELDS,
+    )
+
+
+def refresh(buckets):
+    """Recompute the day rollups of ``(day, doctor_id)`` buckets and the month rollups containing them."""
+    doctor_ids = {doctor_id for _, doctor_id in buckets}
+    days = {day for day, _ in buckets}
+    with transaction.atomic():
+        # Serializes the refreshes of a doctor's buckets
+        list(Doctor.objects.select_for_update().filter(pk__in=doctor_ids).values_list('pk'))
+        invoices = Invoice.objects.filter(
+            appointment__doctor_id__in=doctor_ids,
+            paid_at__gte=_day_start(min(days)),
+            paid_at__lt=_day_start(max(days) + timedelta(days=1)),
+        )
+        rows = {key: values for key, values in day_rows(invoices).items() if key[:2] in buckets}
+        _replace('day', reduce(or_, [Q(period=day, doctor_id=doctor_id) for day, doctor_id in buckets]), rows)
+
+        for granularity in ROLLED_UP:
+            periods = defaultdict(set)
+            for day, doctor_id in buckets:
+                periods[period_start(granularity, day)].add(doctor_id)
+            for period, period_doctors in periods.items():
+                _replace(
+                    granularity, Q(period=period, doctor_id__in=period_doctors),
+                    period_rows(granularity, period, period_doctors),
+                )
+
+
+def schedule_refresh(model, states):
+    """Refresh the buckets the invoice or payment ``states`` count towards once the transaction commits."""
+    # Resolved now: a deleted invoice's appointment may be gone after the commit
+    buckets = affected_buckets(model, states)
+    if buckets:
+        transaction.on_commit(lambda: refresh(buckets), robust=True)
+
+
+def rebuild_rollups(start=None, end=None, invoice_model=Invoice, payment_model=Payment, rollup_model=RevenueRollup):
+    """
+    Recompute the rollups of every month from ``start`` to ``end`` (dates;
+    by default every month with paid invoices), one month per transaction.
+    Returns ``(months, rows written)``. The model arguments allow running it
+    from a migration with historical models.
+    """
+    if start is None or end is None:
+        bounds = invoice_model.objects.filter(status='paid', paid_at__isnull=False).aggregate(
+            first=Min('paid_at'), last=Max('paid_at')
+        )
+        if bounds['first'] is None:
+            rollup_model.objects.all().delete()
+            return 0, 0
+        start = start or timezone.localdate(bounds['first'])
+        end = end or timezone.localdate(bounds['last'])
+
+    months = written = 0
+    month = period_start('month', start)
+    while month <= end:
+        following = next_period('month', month)
+        with transaction.atomic():
+            rows = day_rows(invoice_model.objects.filter(
+                paid_at__gte=_day_start(month), paid_at__lt=_day_start(following)
+            ), payment_model)
+            _replace('day', Q(period__gte=month, period__lt=following), rows, rollup_model)
+            written += len(rows)
+            # A week spanning two months is summed again with the second one
+            week = period_start('week', month)
+            while week < following:
+                rows = period_rows('week', week, rollup_model=rollup_model)
+                _replace('week', Q(period=week), rows, rollup_model)
+                written += len(rows)
+                week = next_period('week', week)
+            rows = period_rows('month', month, rollup_model=rollup_model)
+            _replace('month', Q(period=month), rows, rollup_model)
+            written += len(rows)
+        months += 1
+        month = following
+    return months, written
+
+
+def report(granularity='month', start=None, end=None, doctor_id=None, specialty=None, payment_method=None):
+    """
+    Return revenue per ``granularity`` period between the ``start`` and
+    ``end`` dates (inclusive) as ``[{granularity: period start, 'total',
+    'invoices'}]``, oldest first.
+    """
+    rollups = RevenueRollup.objects.all()
+    for field, value in (('doctor_id', doctor_id), ('specialty', specialty), ('payment_method', payment_method)):
+        if value is not None:
+            rollups = rollups.filter(**{field: value})
+    totals = defaultdict(lambda: [Decimal('0.00'), 0])
+
+    def add(rows, bucket):
+        for row in rows.annotate(bucket=bucket).order_by().values('bucket').annotate(
+            amount=Sum('total'), count=Sum('invoices')
+        ):
+            totals[row['bucket']][0] += row['amount']
+            totals[row['bucket']][1] += row['count']
+
+    # Whole periods are read from their own rows, partial ones at either end
+    # of the range are summed from day rows
+    first = start if start is None or period_start(granularity, start) == start else next_period(
+        granularity, period_start(granularity, start)
+    )
+    stop = None if end is None else period_start(granularity, end + timedelta(days=1))
+    whole = rollups.filter(granularity=granularity)
+    if first is not None:
+        whole = whole.filter(period__gte=first)
+    if stop is not None:
+        whole = whole.filter(period__lt=stop)
+    add(whole, F('period'))
+
+    if granularity != 'day':
+        days = rollups.filter(granularity='day')
+        trunc = TruncWeek('period') if granularity == 'week' else TruncMonth('period')
+        if start is not None and start < first:
+            head = days.filter(period__gte=start, period__lt=first)
+            if end is not None:
+                head = head.filter(period__lte=end)
+            add(head, trunc)
+        if end is not None and stop <= end:
+            tail = days.filter(period__gte=stop, period__lte=end)
+            if first is not None:
+                # Already covered when the range starts and ends in the same period
+                tail = tail.filter(period__gte=first)
+            add(tail, trunc)
+
+    return [
+        {granularity: period, 'total': total, 'invoices': count}
+        for period, (total, count) in sorted(totals.items())
+    ]
@@ -0,0 +1,225 @@
+"""
+Indexed doctor and patient search.
+
+Every profile stores ``search_document``: the lowercased words of its
+``SEARCH_FIELDS`` (names and email, plus specialty and qualification for
+doctors, phone and blood type for patients). ``Doctor.save()`` and
+``Patient.save()`` rebuild it, and a ``User`` signal in ``core.signals``
+rewrites it when a name, email or phone changes.
+
+Every word of a query must match the start of a word of the document, so
+``jo sha`` finds John Sharma. Matches come best first:
+
+* PostgreSQL: a GIN index on ``to_tsvector('simple', search_document)``
+  answers prefix queries (``jo:* & sha:*``) ranked with ``ts_rank``, and a
+  ``pg_trgm`` GIN index adds misspelled names through word similarity.
+* SQLite: an FTS5 table with prefix indexes, kept in sync with the column by
+  triggers, ranked with bm25.
+* Other databases, and SQLite builds without FTS5 or older than 3.35, scan
+  the column with LIKE.
+
+Blood types are matched exactly on ``blood_type`` instead, as the tokenizers
+cannot tell ``A+`` from ``A-``.
+
+``bulk_create()`` and ``QuerySet.update()`` skip ``save()``, and Django
+drops the SQLite triggers when a migration rebuilds a profile table; run
+``rebuild_search_index`` afterwards.
+"""
+from django.db import connection, connections, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Doctor, Patient, search_document, search_words
+
+INDEXED_MODELS = (Doctor, Patient)
+
+# Values matched exactly on a field instead of through the index
+EXACT_VALUES = {
+    Patient: {'blood_type': {value for value, _ in Patient.BLOOD_TYPE_CHOICES}},
+}
+
+# User fields copied into the profile documents
+USER_FIELDS = frozenset(
+    path.split('__', 1)[1] for model in INDEXED_MODELS for path in model.SEARCH_FIELDS if path.startswith('user__')
+)
+
+POSTGRESQL_INDEX = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (to_tsvector('simple', search_document))",
+    'CREATE INDEX IF NOT EXISTS {table}_search_trgm_idx ON {table} USING gin (search_document gin_trgm_ops)',
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS {table}_search_idx',
+    'DROP INDEX IF EXISTS {table}_search_trgm_idx',
+)
+
+SQLITE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(search_document, content='{table}', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN '
+    'INSERT INTO {fts}(rowid, search_document) VALUES (new.id, new.search_document); END',
+    'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN '
+    "INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF search_document ON {table} BEGIN '
+    "INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    'INSERT INTO {fts}(rowid, search_document) VALUES (new.id, new.search_document); END',
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS {fts}_insert',
+    'DROP TRIGGER IF EXISTS {fts}_delete',
+    'DROP TRIGGER IF EXISTS {fts}_update',
+    'DROP TABLE IF EXISTS {fts}',
+)
+
+# (database alias, model) -> whether its FTS5 table exists
+_fts_tables = {}
+
+
+def _fts_table(model):
+    return f'{model._meta.db_table}_search'
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def _execute(connection, statements, models):
+    """Run the ``{vendor: statements}`` matching ``connection`` for each of ``models``."""
+    statements = statements.get(connection.vendor, ())
+    if connection.vendor == 'sqlite' and not _sqlite_has_fts5(connection):
+        return
+    with connection.cursor() as cursor:
+        for model in models:
+            for sql in statements:
+                cursor.execute(sql.format(table=model._meta.db_table, fts=_fts_table(model)))
+    _fts_tables.clear()
+
+
+def create_index(connection, models=INDEXED_MODELS):
+    """
+    Create the search indexes of ``models`` (current or historical) that are
+    missing, and rebuild the SQLite FTS5 tables from ``search_document``.
+    """
+    _execute(connection, {'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}, models)
+
+
+def drop_index(connection, models=INDEXED_MODELS):
+    """Drop the search indexes of ``models``."""
+    _execute(connection, {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}, models)
+
+
+def _has_fts(alias, model):
+    key = (alias, model)
+    if key not in _fts_tables:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            _fts_tables[key] = _fts_table(model) in connection.introspection.table_names(cursor)
+    return _fts_tables[key]
+
+
+def parse(model, query):
+    """Split ``query`` into index words and exact ``{field: value}`` filters."""
+    terms, exact = [], {}
+    for token in query.split():
+        for field, values in EXACT_VALUES.get(model, {}).items():
+            if token.upper() in values:
+                exact[field] = token.upper()
+                break
+        else:
+            terms += search_words(token)
+    return terms, exact
+
+
+def search_profiles(queryset, query):
+    """
+    Filter a doctor or patient ``queryset`` to the profiles matching every
+    word of ``query`` as a prefix, best matches first.
+    """
+    model = queryset.model
+    terms, exact = parse(model, query)
+    queryset = queryset.filter(**exact)
+    if not terms:
+        return queryset if exact else queryset.none()
+
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = f"{table}.{connection.ops.quote_name('search_document')}"
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        text = ' '.join(terms)
+        vector = f"to_tsvector('simple', {column})"
+        return queryset.filter(RawSQL(
+            f"({vector} @@ to_tsquery('simple', %s) OR %s <%% {column})", (tsquery, text),
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            f"ts_rank({vector}, to_tsquery('simple', %s)) + word_similarity(%s, {column})", (tsquery, text)
+        )).order_by('-search_rank', '-pk')
+
+    # The rank lookup needs AS MATERIALIZED (SQLite 3.35)
+    fts_ready = connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35)
+    if fts_ready and _has_fts(queryset.db, model):
+        fts = connection.ops.quote_name(_fts_table(model))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # Materialized: the rank lookup would otherwise run the MATCH again for every row
+        rank = RawSQL(
+            f'(WITH ranks AS MATERIALIZED (SELECT rowid AS id, rank FROM {fts} WHERE {fts} MATCH %s) '
+            f'SELECT rank FROM ranks WHERE ranks.id = {table}.{connection.ops.quote_name("id")})',
+            (match,), output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', (match,))
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('search_rank', '-pk')
+
+    for term in terms:
+        queryset = queryset.filter(search_document__contains=term)
+    return queryset
+
+
+def refresh_user_documents(user):
+    """Rewrite the documents of ``user``'s profiles after a name, email or phone change."""
+    for model in INDEXED_MODELS:
+        local = [path for path in model.SEARCH_FIELDS if '__' not in path]
+        for profile in model.objects.filter(user_id=user.pk).only('search_document', *local):
+            profile.user = user
+            document = search_document(profile)
+            if document != profile.search_document:
+                model.objects.filter(pk=profile.pk).update(search_document=document)
+
+
+def rebuild_documents(model, batch_size=1000, fields=None):
+    """
+    Recompute the stored documents of every ``model`` profile,
+    ``batch_size`` at a time. Returns the number rewritten. ``fields``
+    defaults to ``model.SEARCH_FIELDS``; a migration passes it with a
+    historical model.
+    """
+    fields = fields or model.SEARCH_FIELDS
+    rewritten = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            profiles = list(
+                model.objects.select_related('user').only('search_document', *fields)
+                .filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+            )
+            if not profiles:
+                return rewritten
+            stale = []
+            for profile in profiles:
+                document = search_document(profile, fields)
+                if document != profile.search_document:
+                    profile.search_document = document
+                    stale.append(profile)
+            model.objects.bulk_update(stale, ['search_document'], batch_size=batch_size)
+        rewritten += len(stale)
+        last_pk = profiles[-1].pk
+
+
+def rebuild_search_index(batch_size=1000):
+    """Recompute every search document, then recreate and refill the indexes. Returns the documents rewritten."""
+    rewritten = sum(rebuild_documents(model, batch_size) for model in INDEXED_MODELS)
+    create_index(connection)
+    return rewritten
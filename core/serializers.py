@@ -4,6 +4,77 @@ Serializers for Hospital Management System.
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import User, Doctor, Patient, Appointment, Prescription, Invoice
+from .stats import appointment_counts
+
+SLOT_TAKEN_MESSAGE = 'Doctor is not available at this time.'
+
+
+def appointment_counts_context(objects):
+    """
+    Build serializer context holding appointment counts for every doctor and
+    patient reachable from ``objects``, so nested serializers of a list
+    response don't issue one COUNT query per row.
+    """
+    doctor_ids, patient_ids = set(), set()
+    for obj in objects:
+        if isinstance(obj, Doctor):
+            doctor_ids.add(obj.pk)
+        elif isinstance(obj, Patient):
+            patient_ids.add(obj.pk)
+        else:
+            if isinstance(obj, Prescription):
+                if obj.created_by_id:
+                    doctor_ids.add(obj.created_by_id)
+                obj = obj.appointment
+            elif isinstance(obj, Invoice):
+                obj = obj.appointment
+            if isinstance(obj, Appointment):
+                doctor_ids.add(obj.doctor_id)
+                patient_ids.add(obj.patient_id)
+    return {
+        'doctor_appointment_counts': appointment_counts('doctor', doctor_ids),
+        'patient_appointment_counts': appointment_counts('patient', patient_ids),
+    }
+
+
+def requested_expansions(request):
+    """Return the relation names listed in the ``?expand=`` query parameter."""
+    if request is None:
+        return set()
+    value = request.query_params.get('expand', '')
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class ExpandableFieldsMixin:
+    """
+    Compact serializer that nests related objects only on request.
+    
+    ``expandable_fields`` maps an ``?expand=`` name to the output field name
+    and a callable building the nested serializer, e.g.
+    ``?expand=doctor,patient`` adds ``doctor_details`` and ``patient_details``.
+    """
+    
+    expandable_fields = {}
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = requested_expansions(self.context.get('request'))
+        for name, (field_name, build) in self.expandable_fields.items():
+            if name in expand:
+                fields[field_name] = build()
+        return fields
+
+
+def _total_appointments(serializer, obj, counts_key):
+    """Read a pre-computed appointment count, falling back to a COUNT query."""
+    context = serializer.context
+    if 'appointment_count_sources' in context:
+        # Counts are only computed once a serializer actually needs them
+        context.update(appointment_counts_context(context.pop('appointment_count_sources')))
+    counts = context.get(counts_key) or {}
+    if obj.pk in counts:
+        return counts[obj.pk]
+    return obj.appointments.count()
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -64,7 +135,7 @@ class DoctorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_total_appointments(self, obj):
-        return obj.appointments.count()
+        return _total_appointments(self, obj, 'doctor_appointment_counts')
     
     def create(self, validated_data):
         user_id = validated_data.pop('user_id', None)
@@ -94,7 +165,7 @@ class PatientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_total_appointments(self, obj):
-        return obj.appointments.count()
+        return _total_appointments(self, obj, 'patient_appointment_counts')
     
     def create(self, validated_data):
         user_id = validated_data.pop('user_id', None)
@@ -124,26 +195,43 @@ class AppointmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def conflicting_appointments(self, data):
+        """Return the other appointments holding the slot ``data`` books, if any."""
+        instance = self.instance
+        doctor = data.get('doctor', instance.doctor if instance else None)
+        appointment = Appointment(
+            appointment_date=data.get('appointment_date', instance.appointment_date if instance else None),
+            status=data.get('status', instance.status if instance else 'scheduled'),
+        )
+        slot = appointment.compute_slot_start()
+        if not (doctor and slot):
+            return Appointment.objects.none()
+        conflicting = Appointment.objects.filter(doctor=doctor, slot_start=slot)
+        if instance:
+            conflicting = conflicting.exclude(pk=instance.pk)
+        return conflicting
+    
     def validate(self, data):
-        doctor = data.get('doctor')
-        patient = data.get('patient')
-        appointment_date = data.get('appointment_date')
-        
-        # Check if doctor is available at the time
-        if doctor and appointment_date:
-            conflicting = Appointment.objects.filter(
-                doctor=doctor,
-                appointment_date=appointment_date,
-                status__in=['scheduled', 'confirmed']
-            ).exists()
-            if conflicting:
-                raise serializers.ValidationError({
-                    'appointment_date': 'Doctor is not available at this time.'
-                })
+        # Friendly early answer; the appt_doctor_slot_uniq constraint is what
+        # actually settles concurrent bookings (see AppointmentViewSet)
+        if self.conflicting_appointments(data).exists():
+            raise serializers.ValidationError({
+                'appointment_date': SLOT_TAKEN_MESSAGE
+            })
         
         return data
 
 
+class BulkAppointmentItemSerializer(serializers.Serializer):
+    """One booking of a bulk request; ids are resolved in batch by core.booking."""
+    
+    doctor = serializers.IntegerField()
+    patient = serializers.IntegerField()
+    appointment_date = serializers.DateTimeField()
+    reason = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class PrescriptionSerializer(serializers.ModelSerializer):
     """Serializer for Prescription model."""
     
@@ -174,6 +262,111 @@ class InvoiceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'paid_at', 'created_at', 'updated_at']
 
 
+# ============================================
+# COMPACT LIST SERIALIZERS
+# ============================================
+
+class DoctorListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact Doctor serializer for list endpoints (``?expand=user``)."""
+    
+    name = serializers.CharField(source='user.get_full_name', read_only=True)
+    
+    expandable_fields = {
+        'user': ('user_details', lambda: UserSerializer(source='user', read_only=True)),
+    }
+    
+    class Meta:
+        model = Doctor
+        fields = [
+            'id', 'user', 'name', 'specialty', 'qualification', 'experience',
+            'consultation_fee', 'is_available'
+        ]
+        read_only_fields = fields
+
+
+class PatientListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact Patient serializer for list endpoints (``?expand=user``)."""
+    
+    name = serializers.CharField(source='user.get_full_name', read_only=True)
+    
+    expandable_fields = {
+        'user': ('user_details', lambda: UserSerializer(source='user', read_only=True)),
+    }
+    
+    class Meta:
+        model = Patient
+        fields = ['id', 'user', 'name', 'gender', 'blood_type']
+        read_only_fields = fields
+
+
+class AppointmentListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact Appointment serializer for list endpoints (``?expand=doctor,patient``)."""
+    
+    doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True)
+    patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
+    
+    expandable_fields = {
+        'doctor': ('doctor_details', lambda: DoctorSerializer(source='doctor', read_only=True)),
+        'patient': ('patient_details', lambda: PatientSerializer(source='patient', read_only=True)),
+    }
+    
+    class Meta:
+        model = Appointment
+        fields = [
+            'id', 'doctor', 'doctor_name', 'patient', 'patient_name',
+            'appointment_date', 'status', 'reason', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class PrescriptionListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact Prescription serializer for list endpoints (``?expand=appointment,doctor,patient``)."""
+    
+    doctor = serializers.IntegerField(source='created_by_id', read_only=True)
+    doctor_name = serializers.CharField(source='created_by.user.get_full_name', read_only=True, default='')
+    patient = serializers.IntegerField(source='appointment.patient_id', read_only=True)
+    patient_name = serializers.CharField(source='appointment.patient.user.get_full_name', read_only=True)
+    
+    expandable_fields = {
+        'appointment': ('appointment_details', lambda: AppointmentSerializer(source='appointment', read_only=True)),
+        'doctor': ('doctor_details', lambda: DoctorSerializer(source='created_by', read_only=True)),
+        'patient': ('patient_details', lambda: PatientSerializer(source='appointment.patient', read_only=True)),
+    }
+    
+    class Meta:
+        model = Prescription
+        fields = [
+            'id', 'appointment', 'doctor', 'doctor_name', 'patient', 'patient_name',
+            'medications', 'dosage', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class InvoiceListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact Invoice serializer for list endpoints (``?expand=appointment,doctor,patient``)."""
+    
+    appointment_date = serializers.DateTimeField(source='appointment.appointment_date', read_only=True)
+    doctor = serializers.IntegerField(source='appointment.doctor_id', read_only=True)
+    doctor_name = serializers.CharField(source='appointment.doctor.user.get_full_name', read_only=True)
+    patient = serializers.IntegerField(source='appointment.patient_id', read_only=True)
+    patient_name = serializers.CharField(source='appointment.patient.user.get_full_name', read_only=True)
+    
+    expandable_fields = {
+        'appointment': ('appointment_details', lambda: AppointmentSerializer(source='appointment', read_only=True)),
+        'doctor': ('doctor_details', lambda: DoctorSerializer(source='appointment.doctor', read_only=True)),
+        'patient': ('patient_details', lambda: PatientSerializer(source='appointment.patient', read_only=True)),
+    }
+    
+    class Meta:
+        model = Invoice
+        fields = [
+            'id', 'appointment', 'appointment_date', 'doctor', 'doctor_name',
+            'patient', 'patient_name', 'amount', 'status', 'due_date', 'paid_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class LoginSerializer(serializers.Serializer):
     """Serializer for user login."""
     
@@ -221,3 +414,6 @@ class DashboardStatsSerializer(serializers.Serializer):
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
     completed_appointments = serializers.IntegerField()
     cancelled_appointments = serializers.IntegerField()
+    total_operations = serializers.IntegerField()
+    pending_leaves = serializers.IntegerField()
+    pending_payments = serializers.IntegerField()
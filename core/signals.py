@@ -0,0 +1,162 @@
+"""
+Model signal handlers for Hospital Management System.
+"""
+from django.apps import apps
+from django.db.models.signals import post_save, pre_delete, post_delete
+
+from . import aggregates, cache, counters, occupancy, revenue, search
+from .models import User, Appointment, Prescription, Invoice, Payment, MedicalRecord
+
+
+# Fields whose previous values the save and delete handlers below compare
+TRACKED_FIELDS = {}
+for tracked in (counters, aggregates, revenue, occupancy):
+    for model, fields in tracked.TRACKED_FIELDS.items():
+        TRACKED_FIELDS.setdefault(model, set()).update(fields)
+
+
+def _previous(instance, fields):
+    """
+    Return a copy of ``instance`` holding the values it was read with, or
+    None when one of ``fields`` was not read. The values come from
+    ``LoadedValuesMixin``, so nothing is captured for rows that are never
+    saved.
+    """
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None or not set(fields).issubset(loaded):
+        return None
+    previous = type(instance).__new__(type(instance))
+    previous.__dict__.update(instance.__dict__, **loaded)
+    return previous
+
+
+def _remember(instance):
+    """Make the just written values the ones the next save compares with."""
+    instance._loaded_values = {
+        name: instance.__dict__[name] for name in TRACKED_FIELDS[type(instance)] if name in instance.__dict__
+    }
+
+
+def _schedule_refresh_on_save(module, sender, instance, created):
+    """Have ``module`` (revenue or occupancy) refresh what the old and new state of ``instance`` touch."""
+    new = module.state(instance)
+    previous = None if created else _previous(instance, module.TRACKED_FIELDS[sender])
+    if previous is not None and module.state(previous) == new:
+        return
+    # An existing row loaded without a tracked field has no previous state:
+    # its old bucket is unknown, rebuild_revenue_rollups or rebuild_occupancy
+    # repairs it if it moved
+    old = [module.state(previous)] if previous is not None else []
+    module.schedule_refresh(sender, old + [new])
+
+
+def _track_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    for module in (counters, aggregates):
+        if sender not in module.TRACKED_FIELDS:
+            continue
+        previous = None if created else _previous(instance, module.TRACKED_FIELDS[sender])
+        if not created and previous is None:
+            # Loaded without a tracked field: rebuild_dashboard_counters and
+            # reconcile_aggregates repair any drift
+            continue
+        old = module.contributions(previous) if previous is not None else {}
+        module.apply_deltas(counters.diff(old, module.contributions(instance)))
+    for module in (revenue, occupancy):
+        if sender in module.TRACKED_FIELDS:
+            _schedule_refresh_on_save(module, sender, instance, created)
+    _remember(instance)
+
+
+def _load_tracked_fields(sender, instance, **kwargs):
+    """
+    Read the tracked fields an instance was loaded without, in one query while
+    its row still exists; deferred ones are filled in on the instance too.
+    """
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    missing = [name for name in TRACKED_FIELDS[sender] if name not in loaded]
+    if missing:
+        row = sender._base_manager.using(instance._state.db).filter(pk=instance.pk).values(*missing).first() or {}
+        for name, value in row.items():
+            instance.__dict__.setdefault(name, value)
+        loaded = {**loaded, **row}
+    instance._loaded_values = loaded
+
+
+def _track_delete(sender, instance, **kwargs):
+    for module in (counters, aggregates):
+        if sender not in module.TRACKED_FIELDS:
+            continue
+        previous = _previous(instance, module.TRACKED_FIELDS[sender])
+        if previous is not None:
+            module.apply_deltas(counters.negate(module.contributions(previous)))
+    for module in (revenue, occupancy):
+        if sender not in module.TRACKED_FIELDS:
+            continue
+        previous = _previous(instance, module.TRACKED_FIELDS[sender])
+        if previous is not None:
+            module.schedule_refresh(sender, [module.state(previous)])
+    instance._loaded_values = None
+
+
+for model in TRACKED_FIELDS:
+    post_save.connect(_track_save, sender=model, dispatch_uid=f'tracked_save_{model.__name__}')
+    pre_delete.connect(_load_tracked_fields, sender=model, dispatch_uid=f'tracked_pre_delete_{model.__name__}')
+    post_delete.connect(_track_delete, sender=model, dispatch_uid=f'tracked_delete_{model.__name__}')
+
+
+def _refresh_search_documents(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # A new user has no profile yet; the profile's save builds its document
+    if raw or created:
+        return
+    if update_fields is not None and not search.USER_FIELDS.intersection(update_fields):
+        return
+    search.refresh_user_documents(instance)
+
+
+post_save.connect(_refresh_search_documents, sender=User, dispatch_uid='search_save_User')
+
+
+def _invalidate_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.invalidate(cache.ENTITIES[sender.__name__])
+
+
+for model in (apps.get_model('core', name) for name in cache.ENTITIES):
+    post_save.connect(_invalidate_cache, sender=model, dispatch_uid=f'cache_save_{model.__name__}')
+    post_delete.connect(_invalidate_cache, sender=model, dispatch_uid=f'cache_delete_{model.__name__}')
+
+
+def _dashboard_owners(instance):
+    """Return the ``(doctor ids, patient ids)`` whose dashboards show ``instance``."""
+    if isinstance(instance, Appointment):
+        return {instance.doctor_id}, {instance.patient_id}
+    if isinstance(instance, (Prescription, Invoice)):
+        if instance._meta.get_field('appointment').is_cached(instance):
+            owners = [(instance.appointment.doctor_id, instance.appointment.patient_id)]
+        else:
+            owners = Appointment.objects.filter(
+                pk=instance.appointment_id
+            ).values_list('doctor_id', 'patient_id')
+        return {doctor_id for doctor_id, _ in owners}, {patient_id for _, patient_id in owners}
+    if isinstance(instance, Payment):
+        return set(), {instance.patient_id}
+    if isinstance(instance, MedicalRecord):
+        return {instance.doctor_id}, {instance.patient_id}
+    return set(), set()
+
+
+def _invalidate_dashboards(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    doctor_ids, patient_ids = _dashboard_owners(instance)
+    cache.invalidate(
+        *[cache.profile_namespace('doctor', doctor_id) for doctor_id in doctor_ids],
+        *[cache.profile_namespace('patient', patient_id) for patient_id in patient_ids],
+    )
+
+
+for model in (Appointment, Prescription, Invoice, Payment, MedicalRecord):
+    post_save.connect(_invalidate_dashboards, sender=model, dispatch_uid=f'dashboards_save_{model.__name__}')
+    post_delete.connect(_invalidate_dashboards, sender=model, dispatch_uid=f'dashboards_delete_{model.__name__}')
@@ -0,0 +1,66 @@
+"""
+Aggregate statistics shared by the HTML and API dashboards.
+"""
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from .models import Doctor, Patient, Appointment, Invoice, DoctorLeave, Operation, Payment
+
+
+def today_bounds():
+    """Return aware datetimes for the start and end of today."""
+    today = timezone.now().date()
+    today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
+    today_end = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.max.time()))
+    return today_start, today_end
+
+
+def compute_dashboard_stats():
+    """
+    Compute the admin dashboard statistics.
+
+    Uses conditional aggregation so every table is scanned by a single query.
+    """
+    today_start, today_end = today_bounds()
+
+    stats = {
+        'total_doctors': Doctor.objects.count(),
+        'total_patients': Patient.objects.count(),
+        'total_operations': Operation.objects.count(),
+    }
+
+    stats.update(Appointment.objects.aggregate(
+        total_appointments=Count('id'),
+        today_appointments=Count('id', filter=Q(
+            appointment_date__gte=today_start,
+            appointment_date__lte=today_end
+        )),
+        completed_appointments=Count('id', filter=Q(status='completed')),
+        cancelled_appointments=Count('id', filter=Q(status='cancelled')),
+    ))
+
+    stats.update(Invoice.objects.aggregate(
+        pending_invoices=Count('id', filter=Q(status='pending')),
+        total_revenue=Sum('amount', filter=Q(status='paid')),
+    ))
+    stats['total_revenue'] = stats['total_revenue'] or 0
+
+    stats['pending_leaves'] = DoctorLeave.objects.filter(status='pending').count()
+    stats['pending_payments'] = Payment.objects.filter(status='pending').count()
+
+    return stats
+
+
+def appointment_counts(field, ids):
+    """
+    Return ``{id: appointment count}`` for the given doctor or patient ids.
+
+    ``field`` is ``'doctor'`` or ``'patient'``. Uses one grouped query.
+    """
+    counts = dict.fromkeys(ids, 0)
+    if counts:
+        rows = Appointment.objects.filter(
+            **{f'{field}_id__in': counts}
+        ).values_list(f'{field}_id').annotate(total=Count('id')).order_by()
+        counts.update(rows)
+    return counts
@@ -0,0 +1,309 @@
+"""
+Tests for Hospital Management System.
+
+Run with ``python manage.py test core``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from rest_framework.test import APITestCase
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import aggregates, counters
+from .models import (
+    User, Doctor, Patient, Appointment, Prescription, Invoice, Payment, RevenueRollup, DoctorDayOccupancy,
+)
+from .revenue import rebuild_rollups
+from .serializers import SLOT_TAKEN_MESSAGE, AppointmentSerializer
+
+
+def create_doctor(username, fee='500.00'):
+    user = User.objects.create_user(username=username, password='x', role='doctor', first_name=username.title())
+    return Doctor.objects.create(
+        user=user, specialty='Cardiology', qualification='MD', license_number=f'LIC-{username}',
+        consultation_fee=Decimal(fee),
+    )
+
+
+def create_patient(username):
+    user = User.objects.create_user(username=username, password='x', role='patient', first_name=username.title())
+    return Patient.objects.create(user=user)
+
+
+class HospitalTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True)
+        self.doctor = create_doctor('house')
+        self.patient = create_patient('jane')
+        self.client.force_authenticate(self.admin)
+        # Tomorrow at 10:00, local time
+        self.when = (timezone.localtime() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def book(self, when=None, patient=None):
+        patient = patient or self.patient
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/appointments/', {
+                'doctor': self.doctor.pk, 'doctor_id': self.doctor.pk,
+                'patient': patient.pk, 'patient_id': patient.pk,
+                'appointment_date': (when or self.when).isoformat(), 'reason': 'Checkup',
+            }, format='json')
+
+    def booked_minutes(self, day):
+        row = DoctorDayOccupancy.objects.filter(doctor=self.doctor, date=day).first()
+        return row.booked if row else ''
+
+
+class BookingTests(HospitalTestCase):
+    def test_taken_slot_is_rejected(self):
+        self.assertEqual(self.book().status_code, 201)
+
+        response = self.book(self.when + timedelta(minutes=10), create_patient('john'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['appointment_date'], [SLOT_TAKEN_MESSAGE])
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_lost_race_for_a_slot_is_rejected_without_an_invoice(self):
+        # Both requests pass the early check, as when they run concurrently;
+        # the unique constraint lets only the first one commit
+        with mock.patch.object(AppointmentSerializer, 'validate', lambda serializer, data: data):
+            first = self.book()
+            second = self.book(self.when + timedelta(minutes=10), create_patient('john'))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.data['appointment_date'], [SLOT_TAKEN_MESSAGE])
+        self.assertEqual(list(Appointment.objects.values_list('pk', flat=True)), [first.data['id']])
+        self.assertEqual(list(Invoice.objects.values_list('appointment_id', flat=True)), [first.data['id']])
+
+    def test_cancelled_slot_can_be_rebooked(self):
+        first = self.book().data['id']
+        self.assertEqual(self.booked_minutes(self.when.date()), '600')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/appointments/{first}/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Appointment.objects.get(pk=first).slot_start)
+        self.assertEqual(self.booked_minutes(self.when.date()), '')
+
+        response = self.book(patient=create_patient('john'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.booked_minutes(self.when.date()), '600')
+
+
+class StoredTotalsTests(HospitalTestCase):
+    def assertNoDrift(self):
+        self.assertEqual(counters.find_drift(), {})
+        for model in aggregates.AGGREGATE_MODELS:
+            self.assertEqual([drift for _, drift in aggregates.reconcile(model, fix=False) if drift], [])
+        stored = sorted(RevenueRollup.objects.values_list('granularity', 'period', 'doctor_id', 'total', 'invoices'))
+        rebuild_rollups()
+        rebuilt = sorted(RevenueRollup.objects.values_list('granularity', 'period', 'doctor_id', 'total', 'invoices'))
+        self.assertEqual(stored, rebuilt)
+
+    def test_mark_paid_keeps_stored_totals_in_step(self):
+        counters.rebuild_counters()
+        self.book()
+        invoice = Invoice.objects.get()
+        self.assertNoDrift()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/invoices/{invoice.pk}/mark_paid/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertNoDrift()
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.total_earnings, Decimal('500.00'))
+        self.assertEqual(counters.read_counters()['total_revenue'], Decimal('500.00'))
+        self.assertEqual(RevenueRollup.objects.get(granularity='day').total, Decimal('500.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(
+                patient=self.patient, invoice=invoice, amount=invoice.amount,
+                payment_method='card', status='completed', paid_at=timezone.now(),
+            )
+        self.assertNoDrift()
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.total_spent, Decimal('500.00'))
+
+
+class PortalIndexTests(HospitalTestCase):
+    """Every query of the doctor and patient portals is answered from an index."""
+
+    PAGES = {
+        'doctor': ('/doctor/', '/doctor/appointments/', '/doctor/patients/', '/doctor/leaves/', '/doctor/operations/'),
+        'patient': (
+            '/patient/', '/patient/appointments/', '/patient/prescriptions/', '/patient/invoices/',
+            '/patient/payments/', '/patient/medical-records/',
+        ),
+    }
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads SQLite query plans')
+    def test_portal_queries_do_not_scan_tables(self):
+        self.book()
+        for profile in (self.doctor, self.patient):
+            self.client.force_login(profile.user)
+            for page in self.PAGES[profile.user.role]:
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.client.get(page).status_code, 200, page)
+                for query in queries:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                        plan = [row[3] for row in cursor.fetchall()]
+                    # SQLite reports a full table scan as SCAN, an index lookup as SEARCH
+                    scans = [step for step in plan if step.startswith('SCAN ')]
+                    self.assertEqual(scans, [], (page, query['sql']))
+
+
+class ConditionalGetTests(HospitalTestCase):
+    def test_list_is_revalidated_after_a_delete(self):
+        self.book()
+        self.book(self.when + timedelta(hours=1))
+        response = self.client.get('/api/invoices/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        response = self.client.get('/api/invoices/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Invoice.objects.order_by('pk').first().delete()
+        response = self.client.get('/api/invoices/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_cursor_page_is_validated_from_its_own_rows(self):
+        for hour in range(3):
+            self.book(self.when + timedelta(hours=hour))
+        first = self.client.get('/api/invoices/?page_size=2')
+        url = first.data['next']
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        aggregate = next(query['sql'] for query in queries if 'MAX(' in query['sql'])
+        self.assertIn(' IN (', aggregate)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Invoice.objects.get(pk=first.data['results'][0]['id']).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Invoice.objects.order_by('pk').first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CursorPaginationTests(HospitalTestCase):
+    def test_pages_cover_rows_sharing_a_timestamp(self):
+        patients = [create_patient(f'patient{n}') for n in range(3)]
+        # Completed appointments hold no slot, so they can share a time
+        expected = [
+            Appointment.objects.create(
+                doctor=self.doctor, patient=patients[n % 3], appointment_date=when, status='completed',
+            ).pk
+            for n, when in enumerate([self.when] * 5 + [self.when - timedelta(days=1)] * 2)
+        ]
+        expected = sorted(expected[:5], reverse=True) + sorted(expected[5:], reverse=True)
+
+        seen, pages = [], []
+        url = '/api/appointments/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 4)
+
+        seen = []
+        url = pages[-1]['previous']
+        while url:
+            response = self.client.get(url)
+            seen = [row['id'] for row in response.data['results']] + seen
+            url = response.data['previous']
+        self.assertEqual(seen, expected[:6])
+
+    def test_bad_cursor_is_not_found(self):
+        response = self.client.get('/api/appointments/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class ListQueryCountTests(HospitalTestCase):
+    """List endpoints run the same number of queries however many rows they return."""
+
+    # The ETag aggregate, a COUNT on page-numbered lists and the page itself.
+    # ``?expand=`` skips the ETag; nested doctors and patients add the two
+    # grouped appointment-count queries
+    QUERIES = {
+        '/api/doctors/': 3,
+        '/api/doctors/?expand=user': 2,
+        '/api/patients/': 3,
+        '/api/patients/?expand=user': 2,
+        '/api/appointments/': 2,
+        '/api/appointments/?expand=doctor,patient': 3,
+        '/api/prescriptions/': 2,
+        '/api/prescriptions/?expand=appointment,doctor,patient': 3,
+        '/api/invoices/': 2,
+        '/api/invoices/?expand=appointment,doctor,patient': 3,
+    }
+
+    def add_appointments(self, count):
+        for _ in range(count):
+            patient = create_patient(f'patient{Patient.objects.count()}')
+            self.book(self.when + timedelta(hours=Appointment.objects.count()), patient)
+            Prescription.objects.create(
+                appointment=Appointment.objects.latest('pk'), created_by=self.doctor,
+                medications='Aspirin', dosage='75 mg daily', instructions='After meals',
+            )
+
+    def assertQueryCounts(self):
+        for url, queries in self.QUERIES.items():
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_appointments(1)
+        self.assertQueryCounts()
+
+        create_doctor('wilson')
+        self.add_appointments(4)
+        self.assertQueryCounts()
+
+
+class AvailabilityTests(HospitalTestCase):
+    def test_impossible_dates_are_rejected(self):
+        for query in ('start=2026-02-30', 'end=2026-13-01'):
+            for url in (f'/api/doctors/{self.doctor.pk}/availability/', '/api/doctors/availability/'):
+                response = self.client.get(f'{url}?{query}')
+                self.assertEqual(response.status_code, 400, (url, query))
+
+
+class ExportTests(HospitalTestCase):
+    def test_impossible_dates_are_rejected(self):
+        for query in ('start=2026-02-30', 'end=2026-13-01'):
+            response = self.client.get(f'/api/exports/invoices/csv/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class SearchTests(HospitalTestCase):
+    def test_every_word_matches_a_prefix(self):
+        patients = {}
+        for username, last_name in (('amit', 'Sharma'), ('amitabh', 'Bose'), ('sam', 'Amin')):
+            patients[username] = create_patient(username)
+            patients[username].user.last_name = last_name
+            patients[username].user.save()
+
+        response = self.client.get('/api/patients/?search=ami sha')
+        self.assertEqual([row['id'] for row in response.data['results']], [patients['amit'].pk])
+        response = self.client.get('/api/patients/?search=ami')
+        self.assertEqual(
+            {row['id'] for row in response.data['results']}, {patient.pk for patient in patients.values()}
+        )
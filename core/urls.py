@@ -9,6 +9,7 @@ from .views import (
     AppointmentViewSet, PrescriptionViewSet, InvoiceViewSet,
     DashboardViewSet, ChangePasswordView, populate_database
 )
+from .exports import export
 
 router = DefaultRouter()
 router.register(r'auth', AuthViewSet, basename='auth')
@@ -29,6 +30,9 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/change-password/', ChangePasswordView.as_view(), name='change-password'),
     
+    # Streaming CSV/NDJSON exports (admin only)
+    path('exports/<slug:resource>/<slug:fmt>/', export, name='export'),
+    
     # Populate database endpoint (use with caution!)
     path('populate/', populate_database, name='populate_database'),
 ]
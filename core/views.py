@@ -1,22 +1,41 @@
 """
 API views for Hospital Management System.
 """
-from django.db.models import Count, Sum, Q
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from datetime import timedelta
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework_simplejwt.tokens import RefreshToken
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import User, Doctor, Patient, Appointment, Prescription, Invoice
+from .models import User, Doctor, Patient, Appointment, Prescription, Invoice, Payment
 from .serializers import (
     UserSerializer, UserCreateSerializer, DoctorSerializer, PatientSerializer,
     AppointmentSerializer, PrescriptionSerializer, InvoiceSerializer,
-    LoginSerializer, ChangePasswordSerializer, DashboardStatsSerializer
+    LoginSerializer, ChangePasswordSerializer, DashboardStatsSerializer,
+    DoctorListSerializer, PatientListSerializer, AppointmentListSerializer,
+    PrescriptionListSerializer, InvoiceListSerializer, appointment_counts_context,
+    requested_expansions, SLOT_TAKEN_MESSAGE
 )
+from . import revenue
+from .availability import compute_availability
+from .booking import book_appointments
+from .counters import get_dashboard_stats
+from .filters import IndexedSearchFilter
+from .pagination import AppointmentCursorPagination, CreatedAtCursorPagination, KeysetPagination
 from .permissions import (
     IsAdminUser, IsDoctorUser, IsPatientUser, IsAdminOrReadOnly,
     IsDoctorOrAdmin, IsPatientOrDoctor, CanManageAppointment
@@ -59,6 +78,100 @@ def populate_database(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AppointmentCountsMixin:
+    """
+    Pre-compute appointment counts for list responses.
+    
+    The doctor and patient serializers (also nested in appointments,
+    prescriptions and invoices) report ``total_appointments``; the counts for
+    a whole page are fetched with two grouped queries instead of one COUNT
+    per serialized row. Compact list serializers that don't nest doctors or
+    patients never trigger the queries.
+    """
+    
+    def get_serializer(self, *args, **kwargs):
+        if args and kwargs.get('many'):
+            context = self.get_serializer_context()
+            context['appointment_count_sources'] = args[0]
+            kwargs['context'] = context
+        return super().get_serializer(*args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    ETag validators for GET responses; a request whose ``If-None-Match``
+    still matches gets an empty 304 Not Modified.
+    
+    Lists are validated before anything is serialized, with one aggregate
+    query: the latest ``updated_at`` of the rows and of the
+    ``conditional_related`` rows their names come from, and the row count
+    (which catches deletions). Page-numbered lists aggregate over every
+    filtered row, which their page count scans anyway. Keyset-paginated
+    lists aggregate over the rows of the page just fetched, keyed by their
+    ids and whether neighbouring pages exist, so deep pages stay as cheap as
+    the first. Deletions leave the latest timestamp alone, so lists send no
+    Last-Modified. Detail responses and
+    ``?expand=`` lists nest live appointment counts that no timestamp tracks,
+    so their ETag is a hash of the serialized data instead; that saves the
+    transfer but not the work.
+    """
+    
+    conditional_related = ()
+    
+    def list(self, request, *args, **kwargs):
+        if requested_expansions(request):
+            return super().list(request, *args, **kwargs)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        page, window = None, ()
+        if isinstance(self.paginator, KeysetPagination):
+            page = self.paginate_queryset(queryset)
+        if page is not None:
+            pks = [row.pk for row in page]
+            queryset = queryset.filter(pk__in=pks)
+            window = (pks, self.paginator.has_next, self.paginator.has_previous)
+        
+        paths = ['updated_at'] + [f'{path}__updated_at' for path in self.conditional_related]
+        validators = queryset.aggregate(
+            count=Count('pk'), **{f'latest_{index}': Max(path) for index, path in enumerate(paths)}
+        )
+        count = validators.pop('count')
+        latest = max(filter(None, validators.values()), default=None)
+        etag = self._etag(count, latest, *window, request.get_full_path())
+        
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return self._with_validators(response, etag)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            request.method in ('GET', 'HEAD') and response.status_code == 200
+            and not response.has_header('ETag') and getattr(response, 'data', None) is not None
+        ):
+            etag = self._etag(json.dumps(response.data, cls=JSONEncoder, sort_keys=True))
+            response = self._with_validators(
+                get_conditional_response(request, etag=etag, response=response), etag
+            )
+        return response
+    
+    def _etag(self, *parts):
+        # Payloads differ per user and per renderer (JSON or browsable API)
+        parts += (self.request.user.pk, self.request.accepted_renderer.format)
+        return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+    
+    def _with_validators(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+
 class AuthViewSet(viewsets.ViewSet):
     """Authentication endpoints."""
     
@@ -124,7 +237,7 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for User management."""
     
     queryset = User.objects.all()
@@ -149,17 +262,24 @@ class UserViewSet(viewsets.ModelViewSet):
         instance.save()
 
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(ConditionalGetMixin, AppointmentCountsMixin, viewsets.ModelViewSet):
     """ViewSet for Doctor management."""
     
     queryset = Doctor.objects.select_related('user').all()
     serializer_class = DoctorSerializer
-    filter_backends = [DjangoFilterBackend, ]
+    conditional_related = ('user',)
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
     filterset_fields = ['specialty', 'is_available']
-    search_fields = ['user__first_name', 'user__last_name', 'specialty']
+    search_fields = Doctor.SEARCH_FIELDS
     
-    def get_permissions(self):
+    def get_serializer_class(self):
+        # Lists use the compact serializer; ?expand= opts into nested objects
         if self.action == 'list':
+            return DoctorListSerializer
+        return DoctorSerializer
+    
+    def get_permissions(self):
+        if self.action in ['list', 'availability', 'search_availability']:
             return [AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminUser()]
@@ -168,23 +288,77 @@ class DoctorViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Doctor.objects.select_related('user').all()
     
+    def _availability_range(self, request):
+        """Parse ``?start=`` and ``?end=`` (ISO dates); defaults to the next 7 days."""
+        today = timezone.localdate()
+        dates = {}
+        for name in ('start', 'end'):
+            try:
+                dates[name] = parse_date(request.query_params.get(name, ''))
+            except ValueError:
+                raise ValidationError({name: 'Not a valid date.'})
+        start = dates['start'] or today
+        end = dates['end'] or start + timedelta(days=6)
+        if end < start:
+            raise ValidationError({'end': 'End date must not be before start date.'})
+        if (end - start).days >= settings.AVAILABILITY_MAX_DAYS:
+            raise ValidationError({'end': f'Range is limited to {settings.AVAILABILITY_MAX_DAYS} days.'})
+        return start, end
+    
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """Get free appointment slots for a doctor (``?start=&end=``)."""
+        doctor = self.get_object()
+        start, end = self._availability_range(request)
+        slots = compute_availability([doctor.id], start, end)
+        return Response({
+            'doctor': doctor.id,
+            'slot_minutes': settings.APPOINTMENT_SLOT_MINUTES,
+            'days': slots[doctor.id],
+        })
+    
+    @action(detail=False, methods=['get'], url_path='availability')
+    def search_availability(self, request):
+        """Get free slots for all available doctors, optionally by ``?specialty=``."""
+        start, end = self._availability_range(request)
+        doctors = Doctor.objects.filter(is_available=True)
+        specialty = request.query_params.get('specialty')
+        if specialty:
+            doctors = doctors.filter(specialty__iexact=specialty)
+        slots = compute_availability(doctors.values_list('id', flat=True), start, end)
+        return Response({
+            'slot_minutes': settings.APPOINTMENT_SLOT_MINUTES,
+            'doctors': [
+                {'doctor': doctor_id, 'days': days}
+                for doctor_id, days in slots.items() if days
+            ],
+        })
+    
     @action(detail=True, methods=['get'])
     def appointments(self, request, pk=None):
         """Get all appointments for a specific doctor."""
         doctor = self.get_object()
-        appointments = doctor.appointments.all()
-        serializer = AppointmentSerializer(appointments, many=True)
+        appointments = list(doctor.appointments.select_related('doctor__user', 'patient__user'))
+        serializer = AppointmentSerializer(
+            appointments, many=True, context=appointment_counts_context(appointments)
+        )
         return Response(serializer.data)
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ConditionalGetMixin, AppointmentCountsMixin, viewsets.ModelViewSet):
     """ViewSet for Patient management."""
     
     queryset = Patient.objects.select_related('user').all()
     serializer_class = PatientSerializer
-    filter_backends = [DjangoFilterBackend, ]
+    conditional_related = ('user',)
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
     filterset_fields = ['blood_type', 'gender']
-    search_fields = ['user__first_name', 'user__last_name', 'user__email']
+    search_fields = Patient.SEARCH_FIELDS
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PatientListSerializer
+        return PatientSerializer
     
     def get_permissions(self):
         if self.action == 'list':
@@ -200,24 +374,35 @@ class PatientViewSet(viewsets.ModelViewSet):
     def appointments(self, request, pk=None):
         """Get all appointments for a specific patient."""
         patient = self.get_object()
-        appointments = patient.appointments.all()
-        serializer = AppointmentSerializer(appointments, many=True)
+        appointments = list(patient.appointments.select_related('doctor__user', 'patient__user'))
+        serializer = AppointmentSerializer(
+            appointments, many=True, context=appointment_counts_context(appointments)
+        )
         return Response(serializer.data)
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(ConditionalGetMixin, AppointmentCountsMixin, viewsets.ModelViewSet):
     """ViewSet for Appointment management."""
     
     queryset = Appointment.objects.select_related(
         'doctor__user', 'patient__user'
     ).all()
     serializer_class = AppointmentSerializer
+    conditional_related = ('doctor__user', 'patient__user')
+    pagination_class = AppointmentCursorPagination
     filter_backends = [DjangoFilterBackend, ]
     filterset_fields = ['status', 'doctor', 'patient']
     
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AppointmentListSerializer
+        return AppointmentSerializer
+    
     def get_permissions(self):
         if self.action in ['list', 'create']:
             return [AllowAny()]
+        if self.action == 'bulk':
+            return [IsDoctorOrAdmin()]
         return [IsAuthenticated()]
     
     def get_queryset(self):
@@ -225,32 +410,76 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             'doctor__user', 'patient__user'
         ).all()
     
-    def perform_create(self, serializer):
-        doctor_id = self.request.data.get('doctor')
-        patient_id = self.request.data.get('patient')
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Book many appointments at once, e.g. a recurring series or an imported
+        weekly schedule. Accepts ``{"appointments": [...]}`` or a bare list and
+        returns one result per item.
+        """
+        items = request.data.get('appointments') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'appointments': ['Provide a non-empty list of bookings.']})
+        if len(items) > settings.BULK_BOOKING_MAX_ITEMS:
+            raise ValidationError({
+                'appointments': [f'At most {settings.BULK_BOOKING_MAX_ITEMS} bookings per request.']
+            })
+        
+        results = book_appointments(items)
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+    
+    def save_booking(self, serializer):
+        """
+        Save the appointment, turning a lost race for its slot into a 400.
         
-        # Create appointment
-        appointment = serializer.save()
+        Two requests can both pass the serializer's conflict check; the
+        appt_doctor_slot_uniq constraint lets exactly one of them commit.
+        """
+        try:
+            with transaction.atomic():
+                return serializer.save()
+        except IntegrityError:
+            if serializer.conflicting_appointments(serializer.validated_data).exists():
+                raise ValidationError({'appointment_date': [SLOT_TAKEN_MESSAGE]})
+            raise
+    
+    @transaction.atomic
+    def perform_create(self, serializer):
+        appointment = self.save_booking(serializer)
         
         # Create invoice for the appointment
-        doctor = Doctor.objects.get(id=doctor_id)
         Invoice.objects.create(
             appointment=appointment,
-            amount=doctor.consultation_fee,
+            amount=appointment.doctor.consultation_fee,
             description=f"Consultation fee for appointment on {appointment.appointment_date}"
         )
+    
+    def perform_update(self, serializer):
+        self.save_booking(serializer)
 
 
-class PrescriptionViewSet(viewsets.ModelViewSet):
+class PrescriptionViewSet(ConditionalGetMixin, AppointmentCountsMixin, viewsets.ModelViewSet):
     """ViewSet for Prescription management."""
     
     queryset = Prescription.objects.select_related(
         'appointment__doctor__user', 'appointment__patient__user', 'created_by__user'
     ).all()
     serializer_class = PrescriptionSerializer
+    conditional_related = ('created_by__user', 'appointment__patient__user')
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [DjangoFilterBackend, ]
     filterset_fields = ['appointment']
     
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PrescriptionListSerializer
+        return PrescriptionSerializer
+    
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsDoctorOrAdmin()]
@@ -277,16 +506,23 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=doctor)
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ConditionalGetMixin, AppointmentCountsMixin, viewsets.ModelViewSet):
     """ViewSet for Invoice management."""
     
     queryset = Invoice.objects.select_related(
         'appointment__doctor__user', 'appointment__patient__user'
     ).all()
     serializer_class = InvoiceSerializer
+    conditional_related = ('appointment', 'appointment__doctor__user', 'appointment__patient__user')
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [DjangoFilterBackend, ]
     filterset_fields = ['status', 'appointment']
     
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return InvoiceListSerializer
+        return InvoiceSerializer
+    
     def get_permissions(self):
         return [IsAuthenticated()]
     
@@ -317,61 +553,58 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 
 
 class DashboardViewSet(viewsets.ViewSet):
-    """Dashboard analytics with Redis caching."""
+    """Dashboard analytics backed by incrementally maintained counters."""
     
     permission_classes = [IsAdminUser]
     
     def list(self, request):
         """Get dashboard statistics."""
-        from django.core.cache import cache
-        
-        # Try to get from cache
-        cache_key = 'dashboard_stats'
-        stats = cache.get(cache_key)
-        
-        if stats is None:
-            # Calculate statistics
-            today = timezone.now().date()
-            today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
-            today_end = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.max.time()))
-            
-            stats = {
-                'total_doctors': Doctor.objects.count(),
-                'total_patients': Patient.objects.count(),
-                'total_appointments': Appointment.objects.count(),
-                'today_appointments': Appointment.objects.filter(
-                    appointment_date__gte=today_start,
-                    appointment_date__lte=today_end
-                ).count(),
-                'pending_invoices': Invoice.objects.filter(status='pending').count(),
-                'total_revenue': Invoice.objects.filter(status='paid').aggregate(
-                    total=Sum('amount')
-                )['total'] or 0,
-                'completed_appointments': Appointment.objects.filter(status='completed').count(),
-                'cancelled_appointments': Appointment.objects.filter(status='cancelled').count(),
-            }
-            
-            # Cache for 5 minutes
-            cache.set(cache_key, stats, 300)
+        # Counters are kept current by model signals, so no caching is needed
+        stats = get_dashboard_stats()
         
         serializer = DashboardStatsSerializer(stats)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def revenue(self, request):
-        """Get revenue statistics."""
-        from django.db.models.functions import TruncMonth
+        """
+        Get paid revenue per period from the revenue rollups.
         
-        # Monthly revenue
-        monthly_revenue = Invoice.objects.filter(
-            status='paid'
-        ).annotate(
-            month=TruncMonth('paid_at')
-        ).values('month').annotate(
-            total=Sum('amount')
-        ).order_by('month')
+        Query parameters: ``granularity`` (day, week or month; default
+        month), ``start`` and ``end`` (inclusive dates), ``doctor``,
+        ``specialty`` and ``payment_method``.
+        """
+        params = request.query_params
+        errors = {}
+        granularity = params.get('granularity', 'month')
+        if granularity not in revenue.GRANULARITIES:
+            errors['granularity'] = [f'Choose one of: {", ".join(revenue.GRANULARITIES)}.']
+        dates = {}
+        for name in ('start', 'end'):
+            value = params.get(name)
+            if value:
+                dates[name] = parse_date(value)
+                if dates[name] is None:
+                    errors[name] = ['Use an ISO date (YYYY-MM-DD).']
+        if dates.get('start') and dates.get('end') and dates['end'] < dates['start']:
+            errors['end'] = ['End date must not be before start date.']
+        doctor = params.get('doctor')
+        if doctor and not doctor.isdigit():
+            errors['doctor'] = ['Use a doctor id.']
+        payment_method = params.get('payment_method')
+        if payment_method and payment_method not in dict(Payment.PAYMENT_METHOD_CHOICES):
+            errors['payment_method'] = [f'Choose one of: {", ".join(dict(Payment.PAYMENT_METHOD_CHOICES))}.']
+        if errors:
+            raise ValidationError(errors)
         
-        return Response(list(monthly_revenue))
+        return Response(revenue.report(
+            granularity,
+            start=dates.get('start'),
+            end=dates.get('end'),
+            doctor_id=int(doctor) if doctor else None,
+            specialty=params.get('specialty') or None,
+            payment_method=payment_method or None,
+        ))
     
     @action(detail=False, methods=['get'])
     def appointments_by_status(self, request):
@@ -383,7 +616,12 @@ class DashboardViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def clear_cache(self, request):
-        """Clear dashboard cache."""
-        from django.core.cache import cache
-        cache.delete('dashboard_stats')
-        return Response({'message': 'Cache cleared successfully'})
+        """Drop every cached value on all workers and rebuild the dashboard counters."""
+        from . import cache
+        from .counters import rebuild_counters
+        cache.clear()
+        drift = rebuild_counters()
+        return Response({
+            'message': 'Cache cleared and dashboard counters rebuilt successfully',
+            'drifted_counters': sorted(drift),
+        })